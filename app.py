@@ -15,16 +15,22 @@ Routes:
 import asyncio
 import hashlib
 import hmac
-import json
 import logging
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+import os
+import time
+from contextlib import asynccontextmanager
+import httpx
+import orjson
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
 from config import Config
-from db import (init_db, create_project, get_project, list_projects, log_activity,
-                get_activity, get_gaps, get_stats, verify_api_key,
+from db import (init_db, create_project, get_project, get_pooled_db, list_projects,
+                log_activity, get_activity, get_gaps, get_stats, get_dashboard_snapshot,
                 create_customer, get_customer_by_email, update_customer_github_token,
-                link_project_to_customer, get_customer_projects)
+                link_project_to_customer)
 import engine
 import github_client as gh
 import billing
@@ -32,54 +38,178 @@ import billing
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
 log = logging.getLogger("tome")
 
-app = FastAPI(title="Tome", description="Autonomous documentation maintenance", version="0.1.0")
-app.mount("/static", StaticFiles(directory=Config.STATIC_DIR), name="static")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    app.state.http = httpx.AsyncClient(
+        timeout=5, limits=httpx.Limits(max_keepalive_connections=20))
+    app.state.work_q = asyncio.Queue(maxsize=Config.WORK_QUEUE_SIZE)
+    app.state.workers = [
+        asyncio.create_task(_worker(app.state.work_q))
+        for _ in range(Config.WORKER_COUNT)
+    ]
+    # Warm TLS to the upstream APIs off the critical path, so the first
+    # webhook reuses a pooled connection instead of paying the handshake.
+    app.state.prewarm = asyncio.create_task(_prewarm())
+    log.info("Tome started on port %d (%d workers)", Config.PORT, Config.WORKER_COUNT)
+    yield
+    for task in app.state.workers:
+        task.cancel()
+    await app.state.http.aclose()
+    await billing.aclose()
+    await gh.aclose()
+    await engine.aclose()
+
+
+async def _prewarm():
+    """Open connections to GitHub and the configured LLM backend.
+
+    Any response (even 4xx) leaves a warm keep-alive connection in the
+    pool; failures just mean the clients connect lazily as before.
+    """
+    llm_origin = {
+        "anthropic": "https://api.anthropic.com/",
+        "xai": "https://api.x.ai/",
+    }.get(Config.LLM_BACKEND, Config.OLLAMA_URL)
+    await asyncio.gather(
+        gh.get_client().head("/", timeout=5),
+        engine._get_llm_client().head(llm_origin, timeout=5),
+        return_exceptions=True,
+    )
 
 
-@app.on_event("startup")
-async def startup():
-    init_db()
-    log.info("Tome started on port %d", Config.PORT)
+app = FastAPI(title="Tome", description="Autonomous documentation maintenance", version="0.1.0",
+              default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with long-lived caching — assets are referenced with
+    versioned URLs (?v=N), so browsers can cache them for a year."""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        response.headers.setdefault("Cache-Control", "public, max-age=31536000, immutable")
+        return response
+
+
+app.mount("/static", CachedStaticFiles(directory=Config.STATIC_DIR), name="static")
+
+
+# Jobs queued or running right now, keyed by (fn name, args) or an explicit
+# dedup key. A rebase, merge, and tag push can fire several webhooks within a
+# second for the same commits — only the first schedules work.
+_inflight: set = set()
+_inflight_lock = asyncio.Lock()
+
+
+async def _worker(q: "asyncio.Queue"):
+    """Pull (fn, args, key) jobs off the queue and run them one at a time."""
+    while True:
+        fn, args, key = await q.get()
+        try:
+            await fn(*args)
+        except Exception:
+            log.exception("Background job %s failed", getattr(fn, "__name__", fn))
+        finally:
+            if key is not None:
+                async with _inflight_lock:
+                    _inflight.discard(key)
+            q.task_done()
+
+
+async def _enqueue_job(fn, *args, dedup_key=None):
+    """Schedule background work on the bounded worker pool.
+
+    Unlike FastAPI's BackgroundTasks (which runs jobs inline after the
+    response, unbounded), a webhook storm can only ever have WORKER_COUNT
+    pipelines in flight; the rest wait in the queue. Jobs with a dedup_key
+    already queued or running are coalesced; returns False in that case.
+    """
+    if dedup_key is not None:
+        async with _inflight_lock:
+            if dedup_key in _inflight:
+                return False
+            _inflight.add(dedup_key)
+    await app.state.work_q.put((fn, args, dedup_key))
+    return True
 
 
 # --- Landing page ---
 
+_LANDING_PATH = f"{Config.STATIC_DIR}/index.html"
+
+
 @app.get("/", response_class=HTMLResponse)
-async def landing():
+async def landing(request: Request):
+    # FileResponse gets us sendfile plus ETag/Last-Modified headers for free,
+    # instead of reading the file into a Python string per request. Starlette
+    # only answers conditional GETs inside StaticFiles, so match the ETag here.
     try:
-        with open(f"{Config.STATIC_DIR}/index.html") as f:
-            return HTMLResponse(f.read())
+        stat_result = os.stat(_LANDING_PATH)
     except FileNotFoundError:
         return HTMLResponse("<h1>Tome</h1><p>Landing page not found.</p>")
+    response = FileResponse(_LANDING_PATH, media_type="text/html", stat_result=stat_result)
+    if request.headers.get("if-none-match") == response.headers.get("etag"):
+        return Response(status_code=304, headers={"ETag": response.headers["etag"]})
+    return response
 
 
 # --- SEO ---
 
-@app.get("/robots.txt")
-async def robots():
-    return JSONResponse(
-        content="User-agent: *\nAllow: /\nSitemap: https://tomehq.net/sitemap.xml",
-        media_type="text/plain"
-    )
+_ROBOTS_BYTES = b"User-agent: *\nAllow: /\nSitemap: https://tomehq.net/sitemap.xml"
 
-@app.get("/sitemap.xml")
-async def sitemap():
-    return JSONResponse(
-        content="""<?xml version="1.0" encoding="UTF-8"?>
+_SITEMAP_BYTES = b"""<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
   <url><loc>https://tomehq.net/</loc><priority>1.0</priority></url>
   <url><loc>https://tomehq.net/terms</loc><priority>0.3</priority></url>
   <url><loc>https://tomehq.net/privacy</loc><priority>0.3</priority></url>
-</urlset>""",
-        media_type="application/xml"
-    )
+</urlset>"""
+
+
+@app.get("/robots.txt")
+async def robots():
+    return Response(_ROBOTS_BYTES, media_type="text/plain")
+
+@app.get("/sitemap.xml")
+async def sitemap():
+    return Response(_SITEMAP_BYTES, media_type="application/xml")
 
 
 # --- Legal pages ---
 
-@app.get("/terms", response_class=HTMLResponse)
-async def terms():
-    return HTMLResponse(_legal_page("Terms of Service", """
+def _legal_page(title: str, content: str) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} — Tome</title>
+<style>
+  body {{
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
+    background: #0a0a0b; color: #e4e4e7; line-height: 1.7; margin: 0;
+  }}
+  .container {{ max-width: 720px; margin: 0 auto; padding: 48px 24px; }}
+  a.back {{ color: #6366f1; text-decoration: none; font-size: 14px; }}
+  h1 {{ font-size: 32px; font-weight: 800; letter-spacing: -1px; margin: 24px 0; }}
+  h2 {{ font-size: 18px; font-weight: 600; margin: 32px 0 8px; color: #e4e4e7; }}
+  p, li {{ color: #a1a1aa; font-size: 15px; }}
+  ul {{ padding-left: 20px; }}
+  li {{ margin: 4px 0; }}
+</style>
+</head>
+<body>
+<div class="container">
+  <a href="/" class="back">← Back to Tome</a>
+  <h1>{title}</h1>
+  {content}
+</div>
+</body>
+</html>"""
+
+
+_TERMS_BYTES = _legal_page("Terms of Service", """
 <p><strong>Last updated:</strong> February 20, 2026</p>
 <p>These Terms of Service govern your use of Tome ("the Service"), operated by Tome HQ.</p>
 
@@ -109,12 +239,9 @@ async def terms():
 
 <h2>9. Contact</h2>
 <p>Questions? Email <a href="mailto:support@tomehq.net" style="color: #6366f1;">support@tomehq.net</a></p>
-"""))
-
+""").encode()
 
-@app.get("/privacy", response_class=HTMLResponse)
-async def privacy():
-    return HTMLResponse(_legal_page("Privacy Policy", """
+_PRIVACY_BYTES = _legal_page("Privacy Policy", """
 <p><strong>Last updated:</strong> February 20, 2026</p>
 <p>This Privacy Policy describes how Tome HQ ("we") collects, uses, and protects your information when you use Tome ("the Service").</p>
 
@@ -156,118 +283,37 @@ async def privacy():
 
 <h2>8. Contact</h2>
 <p>Questions? Email <a href="mailto:support@tomehq.net" style="color: #6366f1;">support@tomehq.net</a></p>
-"""))
+""").encode()
 
+_TERMS_ETAG = f'"{hashlib.md5(_TERMS_BYTES).hexdigest()}"'
+_PRIVACY_ETAG = f'"{hashlib.md5(_PRIVACY_BYTES).hexdigest()}"'
 
-def _legal_page(title: str, content: str) -> str:
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>{title} — Tome</title>
-<style>
-  body {{
-    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-    background: #0a0a0b; color: #e4e4e7; line-height: 1.7; margin: 0;
-  }}
-  .container {{ max-width: 720px; margin: 0 auto; padding: 48px 24px; }}
-  a.back {{ color: #6366f1; text-decoration: none; font-size: 14px; }}
-  h1 {{ font-size: 32px; font-weight: 800; letter-spacing: -1px; margin: 24px 0; }}
-  h2 {{ font-size: 18px; font-weight: 600; margin: 32px 0 8px; color: #e4e4e7; }}
-  p, li {{ color: #a1a1aa; font-size: 15px; }}
-  ul {{ padding-left: 20px; }}
-  li {{ margin: 4px 0; }}
-</style>
-</head>
-<body>
-<div class="container">
-  <a href="/" class="back">← Back to Tome</a>
-  <h1>{title}</h1>
-  {content}
-</div>
-</body>
-</html>"""
+_LEGAL_HEADERS = {"Cache-Control": "public, max-age=3600"}
 
 
-# --- Dashboard ---
+@app.get("/terms", response_class=HTMLResponse)
+async def terms():
+    return Response(content=_TERMS_BYTES, media_type="text/html",
+                    headers={**_LEGAL_HEADERS, "ETag": _TERMS_ETAG})
 
-@app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard():
-    projects = list_projects()
-    stats = get_stats()
 
-    project_rows = ""
-    for p in projects:
-        project_rows += f"""
-        <tr>
-          <td><a href="/api/projects/{p['id']}" style="color: #6366f1; text-decoration: none;">{p['name']}</a></td>
-          <td style="color: #71717a;">{p['github_owner']}/{p['github_repo']}</td>
-          <td><span style="color: #22c55e;">{p['status']}</span></td>
-        </tr>"""
+@app.get("/privacy", response_class=HTMLResponse)
+async def privacy():
+    return Response(content=_PRIVACY_BYTES, media_type="text/html",
+                    headers={**_LEGAL_HEADERS, "ETag": _PRIVACY_ETAG})
 
-    if not projects:
-        project_rows = '<tr><td colspan="3" style="color: #71717a; text-align: center; padding: 32px;">No projects yet. <a href="/welcome" style="color: #6366f1;">Connect a repo →</a></td></tr>'
 
-    return HTMLResponse(f"""<!DOCTYPE html>
+# --- Dashboard ---
+
+# Everything outside the stats/projects block is constant — pre-encode the
+# prefix and suffix once so each request only formats the small dynamic middle.
+_DASH_PREFIX = """<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="utf-8">
 <meta name="viewport" content="width=device-width, initial-scale=1">
 <title>Dashboard — Tome</title>
-<style>
-  body {{
-    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-    background: #0a0a0b; color: #e4e4e7; margin: 0;
-  }}
-  .container {{ max-width: 960px; margin: 0 auto; padding: 32px 24px; }}
-  nav {{
-    border-bottom: 1px solid #1e1e22; padding: 16px 0;
-    background: #0a0a0b;
-  }}
-  nav .container {{
-    display: flex; justify-content: space-between; align-items: center;
-  }}
-  .logo {{
-    font-size: 20px; font-weight: 700; letter-spacing: -0.5px;
-    color: #e4e4e7; text-decoration: none;
-  }}
-  .logo span {{ color: #6366f1; }}
-  .stats {{
-    display: grid; grid-template-columns: repeat(3, 1fr);
-    gap: 16px; margin: 32px 0;
-  }}
-  .stat {{
-    background: #141416; border: 1px solid #1e1e22; border-radius: 12px;
-    padding: 24px;
-  }}
-  .stat-value {{
-    font-size: 36px; font-weight: 800; letter-spacing: -1px;
-  }}
-  .stat-label {{ font-size: 13px; color: #71717a; margin-top: 4px; }}
-  h2 {{
-    font-size: 20px; font-weight: 700; margin: 32px 0 16px;
-  }}
-  table {{
-    width: 100%; border-collapse: collapse; font-size: 14px;
-    background: #141416; border: 1px solid #1e1e22; border-radius: 12px;
-    overflow: hidden;
-  }}
-  th {{
-    text-align: left; padding: 12px 16px; color: #71717a;
-    font-weight: 500; border-bottom: 1px solid #1e1e22;
-  }}
-  td {{
-    padding: 12px 16px; border-bottom: 1px solid #1e1e22;
-  }}
-  .api-box {{
-    background: #141416; border: 1px solid #1e1e22; border-radius: 12px;
-    padding: 20px; margin-top: 24px;
-    font-family: 'SF Mono', 'Cascadia Code', monospace; font-size: 13px;
-    color: #a1a1aa;
-  }}
-  .api-box code {{ color: #6366f1; }}
-</style>
+<link rel="stylesheet" href="/static/tome.css?v=1">
 </head>
 <body>
 <nav>
@@ -281,7 +327,49 @@ async def dashboard():
   </div>
 </nav>
 <div class="container">
-  <div class="stats">
+""".encode()
+
+_DASH_SUFFIX = f"""
+  <div class="api-box">
+    <strong style="color: #e4e4e7;">API Access</strong><br><br>
+    Trigger a manual scan:<br>
+    <code>curl -X POST {Config.BASE_URL}/api/projects/PROJECT_ID/scan</code><br><br>
+    View documentation gaps:<br>
+    <code>curl {Config.BASE_URL}/api/projects/PROJECT_ID/gaps</code><br><br>
+    <a href="{Config.BASE_URL}/api/health" style="color: #6366f1; text-decoration: none; font-size: 12px;">API Health →</a>
+  </div>
+</div>
+</body>
+</html>""".encode()
+
+
+_ROW_TMPL = """
+        <tr>
+          <td><a href="/api/projects/{id}" style="color: #6366f1; text-decoration: none;">{name}</a></td>
+          <td style="color: #71717a;">{github_owner}/{github_repo}</td>
+          <td><span style="color: #22c55e;">{status}</span></td>
+        </tr>"""
+
+_EMPTY_ROW = '<tr><td colspan="3" style="color: #71717a; text-align: center; padding: 32px;">No projects yet. <a href="/welcome" style="color: #6366f1;">Connect a repo →</a></td></tr>'
+
+# Rendered-page cache: repeat dashboard loads inside the window skip the DB
+# snapshot and row formatting entirely.
+_DASH_TTL = 2
+_dash_cache: tuple[float, bytes] | None = None
+
+
+@app.get("/dashboard", response_class=HTMLResponse)
+async def dashboard():
+    global _dash_cache
+    if _dash_cache and time.monotonic() < _dash_cache[0]:
+        return HTMLResponse(_dash_cache[1])
+
+    projects, stats = await asyncio.to_thread(get_dashboard_snapshot)
+
+    # "".join over a generator is O(total length); += reallocates per row.
+    project_rows = "".join(_ROW_TMPL.format_map(p) for p in projects) or _EMPTY_ROW
+
+    middle = f"""  <div class="stats">
     <div class="stat">
       <div class="stat-value">{stats.get('total_projects', 0)}</div>
       <div class="stat-label">Projects</div>
@@ -300,25 +388,40 @@ async def dashboard():
   <table>
     <tr><th>Name</th><th>Repository</th><th>Status</th></tr>
     {project_rows}
-  </table>
+  </table>"""
 
-  <div class="api-box">
-    <strong style="color: #e4e4e7;">API Access</strong><br><br>
-    Trigger a manual scan:<br>
-    <code>curl -X POST {Config.BASE_URL}/api/projects/PROJECT_ID/scan</code><br><br>
-    View documentation gaps:<br>
-    <code>curl {Config.BASE_URL}/api/projects/PROJECT_ID/gaps</code><br><br>
-    <a href="{Config.BASE_URL}/api/health" style="color: #6366f1; text-decoration: none; font-size: 12px;">API Health →</a>
-  </div>
-</div>
-</body>
-</html>""")
+    html = b"".join([_DASH_PREFIX, middle.encode(), _DASH_SUFFIX])
+    _dash_cache = (time.monotonic() + _DASH_TTL, html)
+    return HTMLResponse(html)
 
 
 # --- Health & Stats ---
 
+# Neither answer needs to be fresher than a few seconds; a short TTL collapses
+# bursty polling (dashboards, uptime monitors) into one DB/HTTP call.
+_HEALTH_TTL = 30
+_STATS_TTL = 5
+_health_cache: tuple[float, dict] | None = None
+_health_lock = asyncio.Lock()
+_stats_cache: tuple[float, dict] | None = None
+
+
 @app.get("/api/health")
 async def health():
+    global _health_cache
+    if _health_cache and time.monotonic() < _health_cache[0]:
+        return _health_cache[1]
+
+    # Single-flight: a probe flood on a cold/expired cache runs one upstream
+    # check while the rest wait for its result.
+    async with _health_lock:
+        if _health_cache and time.monotonic() < _health_cache[0]:
+            return _health_cache[1]
+        return await _probe_health()
+
+
+async def _probe_health() -> dict:
+    global _health_cache
     llm_status = "unknown"
     model = ""
 
@@ -330,61 +433,75 @@ async def health():
         model = Config.XAI_MODEL
     else:
         try:
-            import httpx
-            async with httpx.AsyncClient(timeout=5) as client:
-                r = await client.get(f"{Config.OLLAMA_URL}/api/tags")
-                llm_status = "connected" if r.status_code == 200 else "error"
+            r = await app.state.http.get(f"{Config.OLLAMA_URL}/api/tags")
+            llm_status = "connected" if r.status_code == 200 else "error"
         except Exception:
             llm_status = "disconnected"
         model = Config.OLLAMA_MODEL
 
-    return {
+    result = {
         "status": "ok",
         "llm_backend": Config.LLM_BACKEND,
         "llm_status": llm_status,
         "model": model,
     }
+    _health_cache = (time.monotonic() + _HEALTH_TTL, result)
+    return result
 
 
 @app.get("/api/stats")
 async def stats():
-    return get_stats()
+    global _stats_cache
+    if _stats_cache and time.monotonic() < _stats_cache[0]:
+        result = _stats_cache[1]
+    else:
+        result = await asyncio.to_thread(get_stats)
+        _stats_cache = (time.monotonic() + _STATS_TTL, result)
+    # Let dashboards/proxies reuse the answer for the same window client-side.
+    return ORJSONResponse(result, headers={"Cache-Control": f"public, max-age={_STATS_TTL}"})
 
 
 # --- Project Management ---
 
-@app.post("/api/projects")
-async def create_project_route(request: Request):
-    body = await request.json()
-    required = ["name", "github_owner", "github_repo"]
-    for field in required:
-        if field not in body:
-            raise HTTPException(400, f"Missing required field: {field}")
+class CreateProjectBody(BaseModel):
+    name: str
+    github_owner: str
+    github_repo: str
+    docs_paths: str = "docs/"
+    source_paths: str = "src/"
+    default_branch: str = "main"
 
-    result = create_project(
-        name=body["name"],
-        owner=body["github_owner"],
-        repo=body["github_repo"],
-        docs_paths=body.get("docs_paths", "docs/"),
-        source_paths=body.get("source_paths", "src/"),
-        default_branch=body.get("default_branch", "main"),
+
+@app.post("/api/projects")
+async def create_project_route(body: CreateProjectBody):
+    result = await asyncio.to_thread(
+        create_project,
+        name=body.name,
+        owner=body.github_owner,
+        repo=body.github_repo,
+        docs_paths=body.docs_paths,
+        source_paths=body.source_paths,
+        default_branch=body.default_branch,
     )
 
-    log_activity(result["id"], "project_created",
-                 f"Project '{body['name']}' created for {body['github_owner']}/{body['github_repo']}")
+    await asyncio.to_thread(
+        log_activity, result["id"], "project_created",
+        f"Project '{body.name}' created for {body.github_owner}/{body.github_repo}")
+
+    _project_cache.clear()
 
-    log.info("Project created: %s (%s/%s)", result["id"], body["github_owner"], body["github_repo"])
+    log.info("Project created: %s (%s/%s)", result["id"], body.github_owner, body.github_repo)
     return result
 
 
 @app.get("/api/projects")
 async def list_projects_route():
-    return list_projects()
+    return await asyncio.to_thread(list_projects)
 
 
 @app.get("/api/projects/{project_id}")
 async def get_project_route(project_id: str):
-    p = get_project(project_id)
+    p = await asyncio.to_thread(get_project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
     return p
@@ -392,81 +509,154 @@ async def get_project_route(project_id: str):
 
 @app.get("/api/projects/{project_id}/activity")
 async def get_activity_route(project_id: str, limit: int = 50):
-    p = get_project(project_id)
+    p = await asyncio.to_thread(get_project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
-    return get_activity(project_id, limit)
+    return await asyncio.to_thread(get_activity, project_id, limit)
 
 
 @app.get("/api/projects/{project_id}/gaps")
 async def get_gaps_route(project_id: str, status: str = None):
-    p = get_project(project_id)
+    p = await asyncio.to_thread(get_project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
-    return get_gaps(project_id, status)
+    return await asyncio.to_thread(get_gaps, project_id, status)
 
 
 # --- Repo Scan ---
 
 @app.post("/api/projects/{project_id}/scan")
-async def scan_route(project_id: str, background_tasks: BackgroundTasks):
-    p = get_project(project_id)
+async def scan_route(project_id: str):
+    p = await asyncio.to_thread(get_project, project_id)
     if not p:
         raise HTTPException(404, "Project not found")
 
-    background_tasks.add_task(engine.scan_repo, project_id)
+    if not await _enqueue_job(engine.scan_repo, project_id,
+                              dedup_key=("scan", project_id)):
+        return {"status": "already_scanning", "project_id": project_id}
     return {"status": "scan_started", "project_id": project_id}
 
 
 # --- GitHub Webhook ---
 
 @app.post("/api/webhook/github")
-async def github_webhook(request: Request, background_tasks: BackgroundTasks):
-    body = await request.body()
+async def github_webhook(request: Request):
+    # Busy repos deliver plenty of events we drop on the floor (stars, forks,
+    # workflow runs, ...). Bail on those before paying for the body read,
+    # HMAC, and JSON parse — they have no side effects either way.
     event = request.headers.get("X-GitHub-Event", "")
+    entry = _GH_HANDLERS.get(event)
+    if entry is None:
+        return {"status": "ignored", "event": event}
+    model, handler = entry
+
     signature = request.headers.get("X-Hub-Signature-256", "")
 
-    # Verify signature if secret is configured
+    # Verify signature if secret is configured. The HMAC is fused with the
+    # body read — chunks are hashed as they come off the socket, so a large
+    # push payload gets one pass instead of buffer-everything-then-hash.
     if Config.GITHUB_WEBHOOK_SECRET:
-        if not _verify_signature(body, signature):
+        sig_bytes = _parse_signature(signature)
+        if sig_bytes is None:
             raise HTTPException(401, "Invalid signature")
+        mac = _GH_HMAC_PROTO.copy()
+        body = bytearray()
+        async for chunk in request.stream():
+            mac.update(chunk)
+            body += chunk
+        if not hmac.compare_digest(mac.digest(), sig_bytes):
+            raise HTTPException(401, "Invalid signature")
+    else:
+        body = await request.body()
+
+    payload = model.model_validate_json(bytes(body)) if model else None
+    return await handler(payload)
+
+
+# Module constant so SQLite's statement cache reuses the compiled query.
+_SQL_FIND_PROJECT = ("SELECT id, default_branch FROM projects "
+                     "WHERE github_owner = ? AND github_repo = ? AND status = 'active'")
+
+# (owner, repo) -> (expiry, project-or-None). Hits answer webhooks without a
+# SQLite round-trip. Misses for unregistered repos are cached with a short
+# TTL so stray traffic can't hammer the DB; positive entries live until a
+# project create invalidates the cache.
+_PROJECT_NEG_TTL = 30
+_ZERO_SHA = "0" * 40
+_project_cache: dict[tuple[str, str], tuple[float, dict | None]] = {}
+_project_cache_lock = asyncio.Lock()
+
+
+def _query_active_project(owner: str, repo: str) -> dict | None:
+    with get_pooled_db() as conn:
+        row = conn.execute(_SQL_FIND_PROJECT, (owner, repo)).fetchone()
+    return dict(row) if row else None
+
 
-    payload = json.loads(body)
+async def _find_active_project(owner: str, repo: str) -> dict | None:
+    key = (owner, repo)
+    hit = _project_cache.get(key)
+    if hit is not None and (hit[1] is not None or time.monotonic() < hit[0]):
+        return hit[1]
+    row = await asyncio.to_thread(_query_active_project, owner, repo)
+    async with _project_cache_lock:
+        _project_cache[key] = (time.monotonic() + _PROJECT_NEG_TTL, row)
+    return row
 
-    if event == "ping":
-        return {"status": "pong"}
 
-    if event == "push":
-        return await _handle_push(payload, background_tasks)
+# Webhook payload models. pydantic-core parses and validates the JSON bytes
+# in one compiled pass — no intermediate dict tree, no .get() chains. Extra
+# fields in the (large) GitHub payloads are ignored.
 
-    if event == "pull_request":
-        action = payload.get("action", "")
-        if action == "closed" and payload.get("pull_request", {}).get("merged"):
-            return await _handle_merged_pr(payload, background_tasks)
+class _Repo(BaseModel):
+    full_name: str = ""
 
-    return {"status": "ignored", "event": event}
 
+class PushEvent(BaseModel):
+    repository: _Repo = _Repo()
+    before: str = ""
+    after: str = ""
+    ref: str = ""
 
-async def _handle_push(payload: dict, background_tasks: BackgroundTasks):
+
+class _PRBranch(BaseModel):
+    ref: str = ""
+    sha: str = ""
+
+
+class _PullRequest(BaseModel):
+    number: int | None = None
+    merged: bool = False
+    merge_commit_sha: str | None = None
+    head: _PRBranch = _PRBranch()
+    base: _PRBranch = _PRBranch()
+
+
+class PullRequestEvent(BaseModel):
+    action: str = ""
+    pull_request: _PullRequest = _PullRequest()
+    repository: _Repo = _Repo()
+
+
+async def _handle_push(event: PushEvent):
     """Handle a push event."""
-    repo_full = payload.get("repository", {}).get("full_name", "")
-    before = payload.get("before", "")
-    after = payload.get("after", "")
-    ref = payload.get("ref", "")
+    repo_full = event.repository.full_name
+    before = event.before
+    after = event.after
+    ref = event.ref
 
     if not repo_full or not before or not after:
         return {"status": "ignored", "reason": "missing fields"}
 
+    # Skip if this is an all-zeros "before" (new branch) — cheap guard first,
+    # before any project lookup.
+    if before == _ZERO_SHA:
+        return {"status": "ignored", "reason": "branch creation, no diff"}
+
     owner, repo = repo_full.split("/", 1)
 
     # Find matching project
-    from db import get_db
-    conn = get_db()
-    row = conn.execute(
-        "SELECT id, default_branch FROM projects WHERE github_owner = ? AND github_repo = ? AND status = 'active'",
-        (owner, repo)
-    ).fetchone()
-    conn.close()
+    row = await _find_active_project(owner, repo)
 
     if not row:
         return {"status": "ignored", "reason": "no matching project"}
@@ -476,69 +666,90 @@ async def _handle_push(payload: dict, background_tasks: BackgroundTasks):
     if ref != expected_ref:
         return {"status": "ignored", "reason": f"push to {ref}, not {expected_ref}"}
 
-    # Skip if this is an all-zeros "before" (new branch)
-    if before == "0" * 40:
-        return {"status": "ignored", "reason": "branch creation, no diff"}
-
     log.info("Processing push to %s: %s..%s", repo_full, before[:7], after[:7])
-    background_tasks.add_task(engine.process_push, row["id"], before, after)
+    if not await _enqueue_job(engine.process_push, row["id"], before, after,
+                              dedup_key=("push", row["id"], after)):
+        return {"status": "coalesced", "project_id": row["id"]}
 
     return {"status": "processing", "project_id": row["id"]}
 
 
-async def _handle_merged_pr(payload: dict, background_tasks: BackgroundTasks):
+async def _handle_merged_pr(event: PullRequestEvent):
     """Handle a merged PR — same as push, analyze the merge commit."""
-    pr = payload.get("pull_request", {})
-    repo_full = payload.get("repository", {}).get("full_name", "")
+    pr = event.pull_request
+    repo_full = event.repository.full_name
 
     # Skip PRs created by Tome itself
-    head_ref = pr.get("head", {}).get("ref", "")
-    if head_ref.startswith(Config.TOME_BRANCH_PREFIX):
+    if pr.head.ref.startswith(Config.TOME_BRANCH_PREFIX):
         return {"status": "ignored", "reason": "tome's own PR"}
 
     owner, repo = repo_full.split("/", 1)
-    base_sha = pr.get("base", {}).get("sha", "")
-    merge_sha = pr.get("merge_commit_sha", "")
+    base_sha = pr.base.sha
+    merge_sha = pr.merge_commit_sha or ""
 
     if not base_sha or not merge_sha:
         return {"status": "ignored", "reason": "missing SHAs"}
 
-    from db import get_db
-    conn = get_db()
-    row = conn.execute(
-        "SELECT id FROM projects WHERE github_owner = ? AND github_repo = ? AND status = 'active'",
-        (owner, repo)
-    ).fetchone()
-    conn.close()
+    row = await _find_active_project(owner, repo)
 
     if not row:
         return {"status": "ignored", "reason": "no matching project"}
 
-    log.info("Processing merged PR #%s on %s", pr.get("number"), repo_full)
-    background_tasks.add_task(engine.process_push, row["id"], base_sha, merge_sha)
+    log.info("Processing merged PR #%s on %s", pr.number, repo_full)
+    if not await _enqueue_job(engine.process_push, row["id"], base_sha, merge_sha,
+                              dedup_key=("push", row["id"], merge_sha)):
+        return {"status": "coalesced", "project_id": row["id"]}
 
     return {"status": "processing", "project_id": row["id"]}
 
 
-def _verify_signature(payload: bytes, signature: str) -> bool:
-    if not signature:
-        return False
-    expected = "sha256=" + hmac.new(
-        Config.GITHUB_WEBHOOK_SECRET.encode(), payload, hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(expected, signature)
+async def _handle_ping(event: None):
+    return {"status": "pong"}
+
+
+async def _handle_pull_request(event: PullRequestEvent):
+    if event.action == "closed" and event.pull_request.merged:
+        return await _handle_merged_pr(event)
+    return {"status": "ignored", "event": "pull_request"}
+
+
+# Dispatch is one dict lookup; events without a handler are dropped before
+# the body is even read. Each entry pairs the payload model (None = payload
+# unused) with its handler.
+_GH_HANDLERS = {
+    "ping": (None, _handle_ping),
+    "push": (PushEvent, _handle_push),
+    "pull_request": (PullRequestEvent, _handle_pull_request),
+}
+
+
+# HMAC prototype with the key schedule already initialized; .copy() per
+# request skips the key-padding setup that hmac.new() redoes every time.
+_GH_HMAC_PROTO = (hmac.new(Config.GITHUB_WEBHOOK_SECRET_BYTES, digestmod=hashlib.sha256)
+                  if Config.GITHUB_WEBHOOK_SECRET else None)
+
+
+def _parse_signature(signature: str) -> bytes | None:
+    """Decode a 'sha256=<hex>' signature header to raw digest bytes."""
+    if not signature.startswith("sha256="):
+        return None
+    try:
+        return bytes.fromhex(signature[7:])
+    except ValueError:
+        return None
 
 
 # --- Stripe Billing ---
 
-@app.post("/api/checkout")
-async def checkout(request: Request):
-    body = await request.json()
-    plan = body.get("plan", "pro")
-    email = body.get("email")
+class CheckoutBody(BaseModel):
+    plan: str = "pro"
+    email: str | None = None
 
+
+@app.post("/api/checkout")
+async def checkout(body: CheckoutBody):
     try:
-        session = await billing.create_checkout_session(plan, email)
+        session = await billing.create_checkout_session(body.plan, body.email)
         return {"checkout_url": session.get("url", "")}
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -548,9 +759,9 @@ async def checkout(request: Request):
 
 
 @app.post("/api/onboard")
-async def onboard(request: Request, background_tasks: BackgroundTasks):
+async def onboard(request: Request):
     """Full onboarding: verify repo access, create project, set up webhook, run initial scan."""
-    body = await request.json()
+    body = orjson.loads(await request.body())
 
     required = ["email", "github_owner", "github_repo", "github_token"]
     for field in required:
@@ -570,16 +781,17 @@ async def onboard(request: Request, background_tasks: BackgroundTasks):
         raise HTTPException(400, f"Cannot access {owner}/{repo}. Check your token has 'repo' scope.")
 
     # 2. Create or find customer
-    customer = get_customer_by_email(email)
+    customer = await asyncio.to_thread(get_customer_by_email, email)
     if not customer:
-        customer = create_customer(email=email)
+        customer = await asyncio.to_thread(create_customer, email=email)
 
     # 3. Store their GitHub token
-    update_customer_github_token(customer["id"], token)
+    await asyncio.to_thread(update_customer_github_token, customer["id"], token)
 
     # 4. Create the project
     default_branch = body.get("default_branch", repo_info.get("default_branch", "main"))
-    result = create_project(
+    result = await asyncio.to_thread(
+        create_project,
         name=repo_info.get("full_name", f"{owner}/{repo}"),
         owner=owner,
         repo=repo,
@@ -589,7 +801,8 @@ async def onboard(request: Request, background_tasks: BackgroundTasks):
     )
 
     # 5. Link project to customer
-    link_project_to_customer(result["id"], customer["id"])
+    await asyncio.to_thread(link_project_to_customer, result["id"], customer["id"])
+    _project_cache.clear()
 
     # 6. Set up webhook on the repo
     webhook_ok = False
@@ -600,11 +813,13 @@ async def onboard(request: Request, background_tasks: BackgroundTasks):
         log.warning("Webhook creation failed for %s/%s: %s (may already exist)", owner, repo, e)
         # Not fatal — they may have already set it up, or can do it manually
 
-    log_activity(result["id"], "project_onboarded",
-                 f"Project onboarded by {email}. Webhook: {'OK' if webhook_ok else 'manual setup needed'}")
+    await asyncio.to_thread(
+        log_activity, result["id"], "project_onboarded",
+        f"Project onboarded by {email}. Webhook: {'OK' if webhook_ok else 'manual setup needed'}")
 
     # 7. Kick off initial scan in background
-    background_tasks.add_task(engine.scan_repo, result["id"])
+    await _enqueue_job(engine.scan_repo, result["id"],
+                       dedup_key=("scan", result["id"]))
 
     log.info("Onboarded: %s/%s for %s (project=%s)", owner, repo, email, result["id"])
     return {
@@ -624,7 +839,7 @@ async def stripe_webhook(request: Request):
         raise HTTPException(401, "Invalid signature")
 
     try:
-        event = json.loads(body)
+        event = orjson.loads(body)
         await billing.handle_webhook_event(event)
         return {"status": "ok"}
     except Exception as e:
@@ -632,79 +847,19 @@ async def stripe_webhook(request: Request):
         raise HTTPException(500, "Webhook processing failed")
 
 
-@app.get("/welcome", response_class=HTMLResponse)
-async def welcome(session_id: str = None):
-    # Try to look up customer email from Stripe session
-    email = ""
-    if session_id:
-        try:
-            session = await billing.get_session(session_id)
-            email = session.get("customer_email", "") or session.get("customer_details", {}).get("email", "")
-        except Exception:
-            pass
-
-    return HTMLResponse(f"""<!DOCTYPE html>
+# The welcome page is constant except for the prefilled email — pre-encode
+# the halves around it once; the no-email page (the common case) is fully
+# prebuilt.
+_WELCOME_PREFIX = ("""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="utf-8">
 <meta name="viewport" content="width=device-width, initial-scale=1">
 <title>Welcome to Tome — Connect Your Repo</title>
-<style>
-  body {{
-    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-    background: #0a0a0b; color: #e4e4e7; margin: 0;
-    display: flex; align-items: center; justify-content: center; min-height: 100vh;
-  }}
-  .card {{
-    background: #141416; border: 1px solid #1e1e22; border-radius: 16px;
-    padding: 48px; max-width: 560px; width: 100%;
-  }}
-  h1 {{ font-size: 28px; font-weight: 800; letter-spacing: -1px; margin-bottom: 8px; }}
-  h1 span {{ color: #6366f1; }}
-  .subtitle {{ color: #71717a; font-size: 15px; margin-bottom: 32px; }}
-  .step-indicator {{
-    display: flex; gap: 8px; margin-bottom: 24px;
-  }}
-  .step-dot {{
-    width: 8px; height: 8px; border-radius: 50%; background: #1e1e22;
-  }}
-  .step-dot.active {{ background: #6366f1; }}
-  label {{
-    display: block; font-size: 13px; font-weight: 600; color: #a1a1aa;
-    margin-bottom: 6px; margin-top: 16px;
-  }}
-  input, select {{
-    width: 100%; padding: 10px 12px; border-radius: 8px;
-    border: 1px solid #1e1e22; background: #0a0a0b; color: #e4e4e7;
-    font-size: 14px; font-family: inherit; box-sizing: border-box;
-  }}
-  input:focus, select:focus {{
-    outline: none; border-color: #6366f1;
-  }}
-  input::placeholder {{ color: #52525b; }}
-  .help {{ font-size: 12px; color: #52525b; margin-top: 4px; }}
-  .help a {{ color: #6366f1; text-decoration: none; }}
-  button {{
-    width: 100%; padding: 14px; border-radius: 8px; border: none;
-    background: #6366f1; color: white; font-size: 16px; font-weight: 600;
-    cursor: pointer; margin-top: 24px; transition: background 0.15s;
-    font-family: inherit;
-  }}
-  button:hover {{ background: #4f46e5; }}
-  button:disabled {{ background: #27272a; color: #52525b; cursor: not-allowed; }}
-  .error {{ color: #ef4444; font-size: 13px; margin-top: 8px; display: none; }}
-  .success {{ display: none; text-align: center; }}
-  .success h2 {{ font-size: 24px; font-weight: 700; margin-bottom: 12px; }}
-  .success p {{ color: #71717a; font-size: 15px; margin-bottom: 24px; }}
-  .success a {{
-    display: inline-block; background: #6366f1; color: white;
-    padding: 12px 28px; border-radius: 8px; text-decoration: none;
-    font-weight: 600;
-  }}
-  .row {{ display: grid; grid-template-columns: 1fr 1fr; gap: 12px; }}
-</style>
+<link rel="stylesheet" href="/static/tome.css?v=1">
+<script src="/static/onboard.js?v=1" defer></script>
 </head>
-<body>
+<body class="onboard">
 <div class="card">
   <div id="form-view">
     <h1>Welcome to <span>Tome</span></h1>
@@ -717,7 +872,8 @@ async def welcome(session_id: str = None):
 
     <form id="onboard-form" onsubmit="return submitOnboarding(event)">
       <label>Email</label>
-      <input type="email" name="email" placeholder="you@company.com" value="{email}" required>
+      <input type="email" name="email" placeholder="you@company.com" """ + 'value="').encode()
+_WELCOME_SUFFIX = ('"' + """ required>
 
       <label>GitHub Repository</label>
       <div class="row">
@@ -756,47 +912,23 @@ async def welcome(session_id: str = None):
   </div>
 </div>
 
-<script>
-async function submitOnboarding(e) {{
-  e.preventDefault();
-  const form = e.target;
-  const btn = document.getElementById('submit-btn');
-  const errEl = document.getElementById('error-msg');
-  errEl.style.display = 'none';
-  btn.disabled = true;
-  btn.textContent = 'Connecting...';
-
-  const data = {{
-    email: form.email.value,
-    github_owner: form.github_owner.value,
-    github_repo: form.github_repo.value,
-    github_token: form.github_token.value,
-    docs_paths: form.docs_paths.value,
-    source_paths: form.source_paths.value,
-    default_branch: form.default_branch.value,
-  }};
-
-  try {{
-    const resp = await fetch('/api/onboard', {{
-      method: 'POST',
-      headers: {{'Content-Type': 'application/json'}},
-      body: JSON.stringify(data)
-    }});
-    const result = await resp.json();
-    if (!resp.ok) {{
-      throw new Error(result.detail || 'Setup failed');
-    }}
-    document.getElementById('form-view').style.display = 'none';
-    document.getElementById('success-view').style.display = 'block';
-    document.getElementById('project-info').textContent =
-      'Project ID: ' + result.project_id + ' | API Key: ' + result.api_key;
-  }} catch (err) {{
-    errEl.textContent = err.message;
-    errEl.style.display = 'block';
-    btn.disabled = false;
-    btn.textContent = 'Connect Repository';
-  }}
-}}
-</script>
 </body>
-</html>""")
+</html>""").encode()
+_WELCOME_STATIC = _WELCOME_PREFIX + _WELCOME_SUFFIX
+
+
+@app.get("/welcome", response_class=HTMLResponse)
+async def welcome(session_id: str = None):
+    # Try to look up customer email from Stripe session
+    email = ""
+    if session_id:
+        try:
+            session = await billing.get_session(session_id)
+            email = (session.get("customer_email", "")
+                     or (session.get("customer_details") or {}).get("email", ""))
+        except Exception:
+            pass
+
+    if not email:
+        return HTMLResponse(_WELCOME_STATIC)
+    return HTMLResponse(b"".join([_WELCOME_PREFIX, email.encode(), _WELCOME_SUFFIX]))
@@ -6,21 +6,45 @@ import hmac
 import hashlib
 import json
 import logging
+import time
 import httpx
+import db
 from config import Config
 
 log = logging.getLogger("tome.billing")
 
 API = "https://api.stripe.com/v1"
 
+# Reject webhooks whose signed timestamp is outside this window (seconds).
+# Matches Stripe's own recommended tolerance and keeps replayed/forged
+# deliveries from reaching the HMAC at all.
+SIGNATURE_TOLERANCE = 300
+
+# Encoded secret and pre-padded HMAC prototype, built once at import —
+# per-webhook verification just copies the prototype and feeds it bytes.
+_SECRET_BYTES = Config.STRIPE_WEBHOOK_SECRET.encode() if Config.STRIPE_WEBHOOK_SECRET else None
+_HMAC_PROTO = hmac.new(_SECRET_BYTES, digestmod=hashlib.sha256) if _SECRET_BYTES else None
+
 
 def _headers():
     return {"Authorization": f"Bearer {Config.STRIPE_SECRET_KEY}"}
 
 
+# One pooled client for all Stripe calls — keep-alive skips the TCP+TLS
+# handshake after the first request. Closed via aclose() from the app
+# lifespan. Plan prices are snapshotted once at import.
+_client = httpx.AsyncClient(base_url=API, headers=_headers(), timeout=30,
+                            limits=httpx.Limits(max_keepalive_connections=20))
+_prices = dict(Config.STRIPE_PRICES)
+
+
+async def aclose():
+    await _client.aclose()
+
+
 async def create_checkout_session(plan: str, customer_email: str = None) -> dict:
     """Create a Stripe Checkout session for a subscription."""
-    price_id = Config.STRIPE_PRICES.get(plan)
+    price_id = _prices.get(plan)
     if not price_id:
         raise ValueError(f"Unknown plan: {plan}")
 
@@ -36,40 +60,29 @@ async def create_checkout_session(plan: str, customer_email: str = None) -> dict
     if customer_email:
         data["customer_email"] = customer_email
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API}/checkout/sessions",
-            headers=_headers(),
-            data=data,
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _client.post("/checkout/sessions", data=data)
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def get_session(session_id: str) -> dict:
     """Retrieve a checkout session."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/checkout/sessions/{session_id}",
-            headers=_headers(),
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _client.get(f"/checkout/sessions/{session_id}")
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def create_portal_session(customer_id: str) -> dict:
     """Create a Stripe Customer Portal session for managing subscriptions."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API}/billing_portal/sessions",
-            headers=_headers(),
-            data={
-                "customer": customer_id,
-                "return_url": f"{Config.BASE_URL}/dashboard",
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _client.post(
+        "/billing_portal/sessions",
+        data={
+            "customer": customer_id,
+            "return_url": f"{Config.BASE_URL}/dashboard",
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 def verify_webhook_signature(payload: bytes, sig_header: str) -> bool:
@@ -77,63 +90,61 @@ def verify_webhook_signature(payload: bytes, sig_header: str) -> bool:
     if not Config.STRIPE_WEBHOOK_SECRET:
         return True  # skip in dev
 
+    # Single-pass scan for t= and v1= (no dict or tuple-list allocation), and
+    # a raw 32-byte digest compare instead of hex strings.
+    timestamp = ""
+    signature = ""
+    for item in sig_header.split(","):
+        key, _, value = item.partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signature = value
+    if not timestamp or not signature:
+        return False
+
+    # Fail fast on stale or garbage timestamps before paying for the HMAC —
+    # this also bounds the replay window.
     try:
-        elements = dict(item.split("=", 1) for item in sig_header.split(","))
-        timestamp = elements.get("t", "")
-        signature = elements.get("v1", "")
-
-        signed_payload = f"{timestamp}.{payload.decode()}"
-        expected = hmac.new(
-            Config.STRIPE_WEBHOOK_SECRET.encode(),
-            signed_payload.encode(),
-            hashlib.sha256,
-        ).hexdigest()
-
-        return hmac.compare_digest(expected, signature)
-    except Exception:
+        ts = int(timestamp)
+    except ValueError:
         return False
+    if abs(time.time() - ts) > SIGNATURE_TOLERANCE:
+        return False
+
+    try:
+        provided = bytes.fromhex(signature)
+    except ValueError:
+        return False
+
+    mac = _HMAC_PROTO.copy()
+    mac.update(timestamp.encode() + b"." + payload)
+    return len(provided) == 32 and hmac.compare_digest(mac.digest(), provided)
+
+
+# Shared empty-dict sentinel so .get() misses don't allocate a fresh {} per event.
+_EMPTY: dict = {}
 
 
 async def handle_webhook_event(event: dict):
     """Process a Stripe webhook event."""
     event_type = event.get("type", "")
-    data = event.get("data", {}).get("object", {})
+    data = (event.get("data") or _EMPTY).get("object") or _EMPTY
 
     if event_type == "checkout.session.completed":
         stripe_customer_id = data.get("customer", "")
-        email = data.get("customer_email", "") or data.get("customer_details", {}).get("email", "")
+        email = data.get("customer_email", "") or (data.get("customer_details") or _EMPTY).get("email", "")
         subscription_id = data.get("subscription", "")
         log.info("New subscription: customer=%s email=%s sub=%s", stripe_customer_id, email, subscription_id)
 
-        import db
-        # Check if customer already exists (from onboarding)
-        existing = db.get_customer_by_email(email) if email else None
-        if existing:
-            conn = db.get_db()
-            conn.execute(
-                "UPDATE customers SET stripe_customer_id = ?, stripe_subscription_id = ? WHERE id = ?",
-                (stripe_customer_id, subscription_id, existing["id"])
-            )
-            conn.commit()
-            conn.close()
-        else:
-            db.create_customer(
-                email=email,
-                stripe_customer_id=stripe_customer_id,
-                stripe_subscription_id=subscription_id,
-            )
+        # One connection, one transaction — updates the onboarded customer or
+        # creates a new record.
+        db.upsert_customer_from_stripe(email, stripe_customer_id, subscription_id)
 
     elif event_type == "customer.subscription.deleted":
         subscription_id = data.get("id", "")
         log.info("Subscription cancelled: %s", subscription_id)
-        import db
-        conn = db.get_db()
-        conn.execute(
-            "UPDATE customers SET status = 'cancelled' WHERE stripe_subscription_id = ?",
-            (subscription_id,)
-        )
-        conn.commit()
-        conn.close()
+        db.cancel_subscription(subscription_id)
 
     elif event_type == "invoice.payment_failed":
         customer_id = data.get("customer", "")
@@ -1,37 +1,72 @@
 import os
+from dataclasses import dataclass, field
 
-class Config:
-    DB_PATH = os.getenv("TOME_DB", "/data/projects/tome/tome.db")
-    GITHUB_TOKEN = os.getenv("TOME_GITHUB_TOKEN", "")
-    GITHUB_WEBHOOK_SECRET = os.getenv("TOME_WEBHOOK_SECRET", "")
-    HOST = os.getenv("TOME_HOST", "0.0.0.0")
-    PORT = int(os.getenv("TOME_PORT", "8400"))
-    STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
-    TOME_BRANCH_PREFIX = "tome/"
-    MAX_DIFF_SIZE = 8000
-    MAX_DOC_CONTEXT = 4000
+
+@dataclass(frozen=True, slots=True)
+class _Config:
+    """Process-wide settings, read from the environment once at import.
+
+    Frozen slots dataclass: attribute access on the hot paths is a
+    fixed-offset slot read instead of a class-dict/MRO lookup, and nothing
+    can rebind a setting at runtime.
+    """
+
+    DB_PATH: str = os.getenv("TOME_DB", "/data/projects/tome/tome.db")
+    GITHUB_TOKEN: str = os.getenv("TOME_GITHUB_TOKEN", "")
+    GITHUB_WEBHOOK_SECRET: str = os.getenv("TOME_WEBHOOK_SECRET", "")
+    # Pre-encoded once so the webhook hot path doesn't re-encode per request;
+    # filled in __post_init__ from GITHUB_WEBHOOK_SECRET.
+    GITHUB_WEBHOOK_SECRET_BYTES: bytes = b""
+    HOST: str = os.getenv("TOME_HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("TOME_PORT", "8400"))
+    STATIC_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    TOME_BRANCH_PREFIX: str = "tome/"
+    WORK_QUEUE_SIZE: int = int(os.getenv("TOME_WORK_QUEUE_SIZE", "1024"))
+    WORKER_COUNT: int = int(os.getenv("TOME_WORKER_COUNT", "4"))
+    # Uvicorn worker processes. Default 1 — SQLite + in-process caches assume
+    # a single writer; raise only with a shared DB and external cache story.
+    UVICORN_WORKERS: int = int(os.getenv("TOME_UVICORN_WORKERS", "1"))
+    MAX_DIFF_SIZE: int = 8000
+    MAX_DOC_CONTEXT: int = 4000
 
     # LLM backend: "anthropic", "xai", or "ollama"
     # Auto-detects based on available API keys
-    LLM_BACKEND = os.getenv("TOME_LLM_BACKEND",
+    LLM_BACKEND: str = os.getenv(
+        "TOME_LLM_BACKEND",
         "anthropic" if os.getenv("ANTHROPIC_API_KEY")
         else "xai" if os.getenv("XAI_API_KEY")
         else "ollama"
     )
-    ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-    ANTHROPIC_MODEL = os.getenv("TOME_ANTHROPIC_MODEL", "claude-haiku-4-5-20251001")
-    XAI_API_KEY = os.getenv("XAI_API_KEY", "")
-    XAI_MODEL = os.getenv("TOME_XAI_MODEL", "grok-3-mini-fast")
-    OLLAMA_URL = os.getenv("TOME_OLLAMA_URL", "http://localhost:11434")
-    OLLAMA_MODEL = os.getenv("TOME_OLLAMA_MODEL", "llama3.2:3b")
+    # Cap on concurrent LLM generations per pipeline run — high enough to
+    # overlap latency, low enough to stay under provider rate limits.
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("TOME_LLM_MAX_CONCURRENCY", "8"))
+    ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
+    ANTHROPIC_MODEL: str = os.getenv("TOME_ANTHROPIC_MODEL", "claude-haiku-4-5-20251001")
+    # Provider rate limits (requests/min, tokens/min); 0 disables a limit.
+    # Defaults sit under the entry-tier caps so bursts never draw a 429.
+    ANTHROPIC_RPM: int = int(os.getenv("TOME_ANTHROPIC_RPM", "50"))
+    ANTHROPIC_TPM: int = int(os.getenv("TOME_ANTHROPIC_TPM", "40000"))
+    XAI_API_KEY: str = os.getenv("XAI_API_KEY", "")
+    XAI_MODEL: str = os.getenv("TOME_XAI_MODEL", "grok-3-mini-fast")
+    XAI_RPM: int = int(os.getenv("TOME_XAI_RPM", "60"))
+    XAI_TPM: int = int(os.getenv("TOME_XAI_TPM", "60000"))
+    OLLAMA_URL: str = os.getenv("TOME_OLLAMA_URL", "http://localhost:11434")
+    OLLAMA_MODEL: str = os.getenv("TOME_OLLAMA_MODEL", "llama3.2:3b")
 
     # Stripe
-    STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
-    STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
-    STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
-    STRIPE_PRICES = {
+    STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
+    STRIPE_PUBLISHABLE_KEY: str = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
+    STRIPE_WEBHOOK_SECRET: str = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    STRIPE_PRICES: dict = field(default_factory=lambda: {
         "starter": os.getenv("STRIPE_PRICE_STARTER", "price_1T34VjEy0xJzw2UFhpb5i5rB"),
         "pro": os.getenv("STRIPE_PRICE_PRO", "price_1T34VjEy0xJzw2UFaqaashE1"),
         "enterprise": os.getenv("STRIPE_PRICE_ENTERPRISE", "price_1T34VkEy0xJzw2UFiIkcY7wZ"),
-    }
-    BASE_URL = os.getenv("TOME_BASE_URL", "https://tomehq.net")
+    })
+    BASE_URL: str = os.getenv("TOME_BASE_URL", "https://tomehq.net")
+
+    def __post_init__(self):
+        object.__setattr__(self, "GITHUB_WEBHOOK_SECRET_BYTES",
+                           self.GITHUB_WEBHOOK_SECRET.encode())
+
+
+Config = _Config()
@@ -1,18 +1,44 @@
+import hashlib
+import secrets
 import sqlite3
+import threading
 import uuid
 import json
+from contextlib import contextmanager
 from datetime import datetime
 from config import Config
 
+# One long-lived connection per thread. Each sqlite3.connect() re-reads the
+# file header, re-runs the PRAGMAs, and starts with a cold page cache; every
+# accessor below shares its thread's connection instead. Threads come from
+# asyncio's bounded default executor, so the connection count stays small.
+_tls = threading.local()
+
 
 def get_db():
-    conn = sqlite3.connect(Config.DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(Config.DB_PATH, check_same_thread=False,
+                               cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL halves fsyncs in WAL mode; still crash-safe, but a power loss
+        # can drop the last committed transaction — fine for activity/gap rows.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _tls.conn = conn
     return conn
 
 
+@contextmanager
+def get_pooled_db():
+    """Back-compat context manager over the thread-local connection."""
+    yield get_db()
+
+
 def init_db():
     conn = get_db()
     conn.executescript("""
@@ -73,124 +99,252 @@ def init_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
 
+    CREATE TABLE IF NOT EXISTS diff_cache (
+        key TEXT PRIMARY KEY,
+        diff_text TEXT NOT NULL,
+        analysis TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS etag_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT NOT NULL,
+        body TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
     CREATE TABLE IF NOT EXISTS project_customers (
         project_id TEXT REFERENCES projects(id),
         customer_id TEXT REFERENCES customers(id),
         PRIMARY KEY (project_id, customer_id)
     );
+
+    CREATE INDEX IF NOT EXISTS idx_gaps_status ON gaps(status);
+    CREATE INDEX IF NOT EXISTS idx_gaps_pr_url ON gaps(pr_url) WHERE pr_url IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS idx_gaps_project ON gaps(project_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_activity_project ON activity(project_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_projects_repo ON projects(github_owner, github_repo);
+    CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email) WHERE status = 'active';
+    CREATE INDEX IF NOT EXISTS idx_customers_stripe ON customers(stripe_customer_id);
+    CREATE INDEX IF NOT EXISTS idx_customers_sub ON customers(stripe_subscription_id);
+    CREATE INDEX IF NOT EXISTS idx_pc_customer ON project_customers(customer_id);
     """)
+
+    # Migration: fixed-width sha256 key hashes for api_keys. Lookups descend a
+    # 32-byte BLOB index instead of comparing 37-char text keys.
+    cols = [r["name"] for r in conn.execute("PRAGMA table_info(api_keys)")]
+    if "key_hash" not in cols:
+        conn.execute("ALTER TABLE api_keys ADD COLUMN key_hash BLOB")
+    for row in conn.execute("SELECT key FROM api_keys WHERE key_hash IS NULL").fetchall():
+        conn.execute("UPDATE api_keys SET key_hash = ? WHERE key = ?",
+                     (hashlib.sha256(row["key"].encode()).digest(), row["key"]))
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_apikey_hash ON api_keys(key_hash)")
     conn.commit()
-    conn.close()
+
+
+# Hot-path SQL hoisted to module constants: sqlite3's statement cache is
+# keyed by string identity first, so passing the same interned object makes
+# every call a guaranteed cache hit with no re-parse. The list queries name
+# their columns so the row shape is fixed and nothing hidden rides along.
+_PROJECT_COLS = ("id, name, github_owner, github_repo, docs_paths, source_paths, "
+                 "default_branch, installation_id, status, total_gaps_found, "
+                 "total_prs_opened, created_at, updated_at")
+_SQL_GET_PROJECT = "SELECT * FROM projects WHERE id = ?"
+_SQL_LIST_PROJECTS = f"SELECT {_PROJECT_COLS} FROM projects WHERE status = 'active' ORDER BY created_at DESC"
+_SQL_LOG_ACTIVITY = "INSERT INTO activity (project_id, event_type, summary, details) VALUES (?,?,?,?)"
+_SQL_GET_ACTIVITY = ("SELECT id, project_id, event_type, summary, details, created_at "
+                     "FROM activity WHERE project_id = ? ORDER BY created_at DESC LIMIT ?")
+_SQL_INSERT_GAP = "INSERT INTO gaps (project_id, source_file, gap_type, description) VALUES (?,?,?,?)"
+_SQL_BUMP_GAPS = "UPDATE projects SET total_gaps_found = total_gaps_found + 1, updated_at = ? WHERE id = ?"
+_GAP_COLS = ("id, project_id, source_file, gap_type, description, status, "
+             "pr_number, pr_url, doc_file, created_at, resolved_at")
+_SQL_GAPS_BY_STATUS = f"SELECT {_GAP_COLS} FROM gaps WHERE project_id = ? AND status = ? ORDER BY created_at DESC"
+_SQL_GAPS_ALL = f"SELECT {_GAP_COLS} FROM gaps WHERE project_id = ? ORDER BY created_at DESC"
+_SQL_VERIFY_KEY = "SELECT project_id FROM api_keys WHERE key_hash = ?"
+_SQL_LLM_CACHE_GET = "SELECT response FROM llm_cache WHERE key = ?"
+_SQL_LLM_CACHE_PUT = "INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?,?)"
+_SQL_ETAG_GET = "SELECT etag, body FROM etag_cache WHERE url = ?"
+_SQL_ETAG_PUT = "INSERT OR REPLACE INTO etag_cache (url, etag, body) VALUES (?,?,?)"
+_SQL_DIFF_GET = "SELECT diff_text, analysis FROM diff_cache WHERE key = ?"
+_SQL_DIFF_PUT = "INSERT OR REPLACE INTO diff_cache (key, diff_text) VALUES (?,?)"
+_SQL_DIFF_SET_ANALYSIS = "UPDATE diff_cache SET analysis = ? WHERE key = ?"
+
+
+def _fetch_dicts(conn, sql: str, params: tuple = ()) -> list[dict]:
+    """Fetch a result set as dicts without the per-row Row detour.
+
+    dict(sqlite3.Row) walks keys() and does a string-keyed column lookup per
+    cell; fetching plain tuples and zipping once against the cursor's column
+    names builds the same dicts in one C-level pass per row.
+    """
+    cur = conn.execute(sql, params)
+    cur.row_factory = None
+    cols = tuple(d[0] for d in cur.description)
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
 def create_project(name: str, owner: str, repo: str, docs_paths: str = "docs/",
                    source_paths: str = "src/", default_branch: str = "main") -> dict:
-    project_id = str(uuid.uuid4())[:8]
-    api_key = f"tome_{uuid.uuid4().hex}"
+    # token_hex gives the same id/key shapes as the sliced UUIDs did, without
+    # the version/variant byte shuffling; "with conn" wraps both INSERTs in
+    # one transaction so they cost a single fsync.
+    project_id = secrets.token_hex(4)
+    api_key = f"tome_{secrets.token_hex(16)}"
     conn = get_db()
-    conn.execute(
-        "INSERT INTO projects (id, name, github_owner, github_repo, docs_paths, source_paths, default_branch) VALUES (?,?,?,?,?,?,?)",
-        (project_id, name, owner, repo, docs_paths, source_paths, default_branch)
-    )
-    conn.execute(
-        "INSERT INTO api_keys (key, project_id, name) VALUES (?,?,?)",
-        (api_key, project_id, "default")
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "INSERT INTO projects (id, name, github_owner, github_repo, docs_paths, source_paths, default_branch) VALUES (?,?,?,?,?,?,?)",
+            (project_id, name, owner, repo, docs_paths, source_paths, default_branch)
+        )
+        conn.execute(
+            "INSERT INTO api_keys (key, project_id, name, key_hash) VALUES (?,?,?,?)",
+            (api_key, project_id, "default", hashlib.sha256(api_key.encode()).digest())
+        )
     return {"id": project_id, "api_key": api_key}
 
 
 def get_project(project_id: str) -> dict | None:
     conn = get_db()
-    row = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
-    conn.close()
+    row = conn.execute(_SQL_GET_PROJECT, (project_id,)).fetchone()
     return dict(row) if row else None
 
 
 def list_projects() -> list[dict]:
-    conn = get_db()
-    rows = conn.execute("SELECT * FROM projects WHERE status = 'active' ORDER BY created_at DESC").fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    return _fetch_dicts(get_db(), _SQL_LIST_PROJECTS)
 
 
 def log_activity(project_id: str, event_type: str, summary: str, details: str = None):
     conn = get_db()
-    conn.execute(
-        "INSERT INTO activity (project_id, event_type, summary, details) VALUES (?,?,?,?)",
-        (project_id, event_type, summary, details)
-    )
+    conn.execute(_SQL_LOG_ACTIVITY, (project_id, event_type, summary, details))
     conn.commit()
-    conn.close()
 
 
-def get_activity(project_id: str, limit: int = 50) -> list[dict]:
+def log_activity_batch(rows: list[tuple]):
+    """Insert many (project_id, event_type, summary, details) rows at once.
+
+    One executemany in one transaction — a single fsync amortized across the
+    burst instead of one per event.
+    """
+    if not rows:
+        return
     conn = get_db()
-    rows = conn.execute(
-        "SELECT * FROM activity WHERE project_id = ? ORDER BY created_at DESC LIMIT ?",
-        (project_id, limit)
-    ).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    with conn:
+        conn.executemany(_SQL_LOG_ACTIVITY, rows)
+
+
+def get_activity(project_id: str, limit: int = 50) -> list[dict]:
+    return _fetch_dicts(get_db(), _SQL_GET_ACTIVITY, (project_id, limit))
 
 
 def create_gap(project_id: str, source_file: str, gap_type: str, description: str) -> int:
     conn = get_db()
-    cursor = conn.execute(
-        "INSERT INTO gaps (project_id, source_file, gap_type, description) VALUES (?,?,?,?)",
-        (project_id, source_file, gap_type, description)
-    )
+    cursor = conn.execute(_SQL_INSERT_GAP, (project_id, source_file, gap_type, description))
     gap_id = cursor.lastrowid
-    conn.execute(
-        "UPDATE projects SET total_gaps_found = total_gaps_found + 1, updated_at = ? WHERE id = ?",
-        (datetime.utcnow().isoformat(), project_id)
-    )
+    conn.execute(_SQL_BUMP_GAPS, (datetime.utcnow().isoformat(), project_id))
     conn.commit()
-    conn.close()
     return gap_id
 
 
+def create_gaps_bulk(project_id: str, rows: list[tuple[str, str, str]]) -> list[int]:
+    """Insert many (source_file, gap_type, description) gaps in one transaction.
+
+    Returns the new gap ids in input order. One fsync covers the whole
+    batch instead of one per gap, and the project counter moves once.
+    """
+    if not rows:
+        return []
+    conn = get_db()
+    with conn:
+        ids = [conn.execute(_SQL_INSERT_GAP, (project_id, sf, gt, desc)).lastrowid
+               for sf, gt, desc in rows]
+        conn.execute(
+            "UPDATE projects SET total_gaps_found = total_gaps_found + ?, updated_at = ? WHERE id = ?",
+            (len(rows), datetime.utcnow().isoformat(), project_id))
+    return ids
+
+
+def update_gaps_bulk(project_id: str, updates: list[tuple]):
+    """Apply many (gap_id, status, pr_number, pr_url, doc_file) updates at once.
+
+    One executemany in one transaction, with the PR counter bumped once by
+    the number of rows carrying a pr_url — same totals as repeated
+    update_gap calls, minus the per-row commits.
+    """
+    if not updates:
+        return
+    now = datetime.utcnow().isoformat()
+    conn = get_db()
+    with conn:
+        conn.executemany(
+            "UPDATE gaps SET status = ?, pr_number = ?, pr_url = ?, doc_file = ?, resolved_at = ? "
+            "WHERE id = ?",
+            [(status, pr_number, pr_url, doc_file,
+              now if status == "resolved" else None, gap_id)
+             for gap_id, status, pr_number, pr_url, doc_file in updates])
+        bump = sum(1 for _, _, _, pr_url, _ in updates if pr_url)
+        if bump:
+            conn.execute(
+                "UPDATE projects SET total_prs_opened = total_prs_opened + ?, updated_at = ? WHERE id = ?",
+                (bump, now, project_id))
+
+
 def update_gap(gap_id: int, status: str, pr_number: int = None, pr_url: str = None, doc_file: str = None):
     conn = get_db()
-    conn.execute(
-        "UPDATE gaps SET status = ?, pr_number = ?, pr_url = ?, doc_file = ?, resolved_at = ? WHERE id = ?",
-        (status, pr_number, pr_url, doc_file, datetime.utcnow().isoformat() if status == "resolved" else None, gap_id)
-    )
-    if pr_url:
-        row = conn.execute("SELECT project_id FROM gaps WHERE id = ?", (gap_id,)).fetchone()
-        if row:
+    # RETURNING hands back project_id from the UPDATE itself — one B-tree
+    # descent instead of UPDATE plus a follow-up SELECT, in one transaction.
+    with conn:
+        row = conn.execute(
+            "UPDATE gaps SET status = ?, pr_number = ?, pr_url = ?, doc_file = ?, resolved_at = ? "
+            "WHERE id = ? RETURNING project_id",
+            (status, pr_number, pr_url, doc_file,
+             datetime.utcnow().isoformat() if status == "resolved" else None, gap_id)
+        ).fetchone()
+        if pr_url and row:
             conn.execute(
                 "UPDATE projects SET total_prs_opened = total_prs_opened + 1, updated_at = ? WHERE id = ?",
                 (datetime.utcnow().isoformat(), row["project_id"])
             )
-    conn.commit()
-    conn.close()
 
 
 def get_gaps(project_id: str, status: str = None) -> list[dict]:
     conn = get_db()
     if status:
-        rows = conn.execute(
-            "SELECT * FROM gaps WHERE project_id = ? AND status = ? ORDER BY created_at DESC",
-            (project_id, status)
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT * FROM gaps WHERE project_id = ? ORDER BY created_at DESC",
-            (project_id,)
-        ).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        return _fetch_dicts(conn, _SQL_GAPS_BY_STATUS, (project_id, status))
+    return _fetch_dicts(conn, _SQL_GAPS_ALL, (project_id,))
 
 
 def get_stats() -> dict:
     conn = get_db()
-    projects = conn.execute("SELECT COUNT(*) as c FROM projects WHERE status = 'active'").fetchone()["c"]
-    gaps = conn.execute("SELECT COUNT(*) as c FROM gaps").fetchone()["c"]
-    prs = conn.execute("SELECT COUNT(*) as c FROM gaps WHERE pr_url IS NOT NULL").fetchone()["c"]
-    resolved = conn.execute("SELECT COUNT(*) as c FROM gaps WHERE status = 'resolved'").fetchone()["c"]
-    conn.close()
+    stats = _query_stats(conn)
+    return stats
+
+
+def get_dashboard_snapshot() -> tuple[list[dict], dict]:
+    """Projects list and overall stats in one connection round-trip."""
+    conn = get_db()
+    projects = _fetch_dicts(conn, _SQL_LIST_PROJECTS)
+    stats = _query_stats(conn)
+    return projects, stats
+
+
+def _query_stats(conn) -> dict:
+    # One scan of gaps with conditional aggregation instead of three, plus the
+    # projects count as a scalar subquery — a single prepared statement.
+    row = conn.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM projects WHERE status = 'active') AS projects,
+            COUNT(*) AS gaps,
+            COALESCE(SUM(CASE WHEN pr_url IS NOT NULL THEN 1 ELSE 0 END), 0) AS prs,
+            COALESCE(SUM(CASE WHEN status = 'resolved' THEN 1 ELSE 0 END), 0) AS resolved
+        FROM gaps
+    """).fetchone()
+    projects, gaps, prs, resolved = row["projects"], row["gaps"], row["prs"], row["resolved"]
     return {
         "total_projects": projects,
         "total_gaps": gaps,
@@ -204,10 +358,53 @@ def get_stats() -> dict:
     }
 
 
+def get_diff_analysis(key: str) -> tuple[str, str | None] | None:
+    """Return (diff_text, analysis_json) for a cached SHA pair, if present."""
+    conn = get_db()
+    row = conn.execute(_SQL_DIFF_GET, (key,)).fetchone()
+    return (row["diff_text"], row["analysis"]) if row else None
+
+
+def set_push_diff(key: str, diff_text: str):
+    conn = get_db()
+    conn.execute(_SQL_DIFF_PUT, (key, diff_text))
+    conn.commit()
+
+
+def set_diff_analysis(key: str, analysis: str):
+    conn = get_db()
+    conn.execute(_SQL_DIFF_SET_ANALYSIS, (analysis, key))
+    conn.commit()
+
+
+def etag_get(url: str) -> tuple[str, str] | None:
+    conn = get_db()
+    row = conn.execute(_SQL_ETAG_GET, (url,)).fetchone()
+    return (row["etag"], row["body"]) if row else None
+
+
+def etag_put(url: str, etag: str, body: str):
+    conn = get_db()
+    conn.execute(_SQL_ETAG_PUT, (url, etag, body))
+    conn.commit()
+
+
+def get_llm_cache(key: str) -> str | None:
+    conn = get_db()
+    row = conn.execute(_SQL_LLM_CACHE_GET, (key,)).fetchone()
+    return row["response"] if row else None
+
+
+def set_llm_cache(key: str, response: str):
+    conn = get_db()
+    conn.execute(_SQL_LLM_CACHE_PUT, (key, response))
+    conn.commit()
+
+
 def verify_api_key(key: str) -> str | None:
     conn = get_db()
-    row = conn.execute("SELECT project_id FROM api_keys WHERE key = ?", (key,)).fetchone()
-    conn.close()
+    key_hash = hashlib.sha256(key.encode()).digest()
+    row = conn.execute(_SQL_VERIFY_KEY, (key_hash,)).fetchone()
     return row["project_id"] if row else None
 
 
@@ -219,29 +416,63 @@ def create_customer(email: str, stripe_customer_id: str = None, stripe_subscript
         (customer_id, email, stripe_customer_id, stripe_subscription_id, plan)
     )
     conn.commit()
-    conn.close()
     return {"id": customer_id, "email": email, "plan": plan}
 
 
 def get_customer_by_email(email: str) -> dict | None:
     conn = get_db()
     row = conn.execute("SELECT * FROM customers WHERE email = ? AND status = 'active'", (email,)).fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
 def get_customer_by_stripe_id(stripe_customer_id: str) -> dict | None:
     conn = get_db()
     row = conn.execute("SELECT * FROM customers WHERE stripe_customer_id = ?", (stripe_customer_id,)).fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
+def upsert_customer_from_stripe(email: str, stripe_customer_id: str,
+                                stripe_subscription_id: str) -> str:
+    """Attach Stripe ids to the customer with this email, creating one if needed.
+
+    SELECT and UPDATE/INSERT run on one connection in one transaction, so a
+    webhook costs a single open and a single commit.
+    """
+    conn = get_db()
+    with conn:
+        row = None
+        if email:
+            row = conn.execute(
+                "SELECT id FROM customers WHERE email = ? AND status = 'active'", (email,)
+            ).fetchone()
+        if row:
+            customer_id = row["id"]
+            conn.execute(
+                "UPDATE customers SET stripe_customer_id = ?, stripe_subscription_id = ? WHERE id = ?",
+                (stripe_customer_id, stripe_subscription_id, customer_id)
+            )
+        else:
+            customer_id = str(uuid.uuid4())[:8]
+            conn.execute(
+                "INSERT INTO customers (id, email, stripe_customer_id, stripe_subscription_id) VALUES (?,?,?,?)",
+                (customer_id, email, stripe_customer_id, stripe_subscription_id)
+            )
+    return customer_id
+
+
+def cancel_subscription(stripe_subscription_id: str):
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "UPDATE customers SET status = 'cancelled' WHERE stripe_subscription_id = ?",
+            (stripe_subscription_id,)
+        )
+
+
 def update_customer_github_token(customer_id: str, github_token: str):
     conn = get_db()
     conn.execute("UPDATE customers SET github_token = ? WHERE id = ?", (github_token, customer_id))
     conn.commit()
-    conn.close()
 
 
 def link_project_to_customer(project_id: str, customer_id: str):
@@ -249,7 +480,6 @@ def link_project_to_customer(project_id: str, customer_id: str):
     conn.execute("INSERT OR IGNORE INTO project_customers (project_id, customer_id) VALUES (?,?)",
                  (project_id, customer_id))
     conn.commit()
-    conn.close()
 
 
 def get_project_github_token(project_id: str) -> str | None:
@@ -261,17 +491,14 @@ def get_project_github_token(project_id: str) -> str | None:
         WHERE pc.project_id = ? AND c.github_token IS NOT NULL
         LIMIT 1
     """, (project_id,)).fetchone()
-    conn.close()
     return row["github_token"] if row else None
 
 
 def get_customer_projects(customer_id: str) -> list[dict]:
     conn = get_db()
-    rows = conn.execute("""
+    return _fetch_dicts(conn, """
         SELECT p.* FROM projects p
         JOIN project_customers pc ON p.id = pc.project_id
         WHERE pc.customer_id = ? AND p.status = 'active'
         ORDER BY p.created_at DESC
-    """, (customer_id,)).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    """, (customer_id,))
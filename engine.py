@@ -8,96 +8,218 @@ Pipeline:
 5. Generate doc content for each gap
 6. Open a PR with all doc updates
 """
+import asyncio
+import hashlib
 import re
-import json
 import logging
 from datetime import datetime
 import httpx
+import orjson
 from config import Config
+from llm_ratelimit import TokenBucket
 import github_client as gh
 import db
 
 log = logging.getLogger("tome.engine")
 
+# One pooled client for all LLM calls, regardless of backend — httpx keys its
+# pool by origin, so Anthropic, xAI, and Ollama each keep their own warm
+# connections. Lazy like the GitHub client; closed from the app lifespan.
+_llm_client: httpx.AsyncClient | None = None
 
-async def llm_generate(prompt: str, json_mode: bool = False) -> str:
-    """Call configured LLM backend (Anthropic, xAI, or Ollama)."""
+
+def _get_llm_client() -> httpx.AsyncClient:
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = httpx.AsyncClient(
+            timeout=120,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50))
+    return _llm_client
+
+
+async def aclose():
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+# One bucket per backend — Ollama is local, so both limits stay off.
+_BUCKETS = {
+    "anthropic": TokenBucket(Config.ANTHROPIC_RPM, Config.ANTHROPIC_TPM),
+    "xai": TokenBucket(Config.XAI_RPM, Config.XAI_TPM),
+    "ollama": TokenBucket(0, 0),
+}
+
+
+def _llm_model() -> str:
     if Config.LLM_BACKEND == "anthropic":
-        return await _anthropic_generate(prompt, json_mode)
+        return Config.ANTHROPIC_MODEL
     if Config.LLM_BACKEND == "xai":
-        return await _xai_generate(prompt, json_mode)
-    return await _ollama_generate(prompt, json_mode)
+        return Config.XAI_MODEL
+    return Config.OLLAMA_MODEL
+
+
+async def llm_generate(prompt: str, json_mode: bool = False) -> str:
+    """Call configured LLM backend (Anthropic, xAI, or Ollama).
+
+    Responses are cached by content address — webhook retries, re-scans of
+    unchanged modules, and reprocessed pushes build byte-identical prompts,
+    and a cache hit skips the whole LLM round-trip.
+    """
+    key = hashlib.sha256(
+        f"{Config.LLM_BACKEND}|{_llm_model()}|{json_mode}|{prompt}".encode()
+    ).hexdigest()
+    cached = db.get_llm_cache(key)
+    if cached is not None:
+        return cached
+
+    # Pace the actual call: ~4 chars/token for the prompt plus the response
+    # budget. Cache hits above never touch the bucket.
+    bucket = _BUCKETS.get(Config.LLM_BACKEND, _BUCKETS["ollama"])
+    await bucket.acquire(est_tokens=len(prompt) // 4 + 4096)
+
+    if Config.LLM_BACKEND == "anthropic":
+        text = await _anthropic_generate(prompt, json_mode)
+    elif Config.LLM_BACKEND == "xai":
+        text = await _xai_generate(prompt, json_mode)
+    else:
+        text = await _ollama_generate(prompt, json_mode)
+
+    db.set_llm_cache(key, text)
+    return text
+
+
+async def _raise_stream_error(resp: httpx.Response):
+    """Read a streaming error body so raise_for_status can include it."""
+    if resp.status_code >= 400:
+        await resp.aread()
+    resp.raise_for_status()
 
 
 async def _anthropic_generate(prompt: str, json_mode: bool = False) -> str:
-    """Call Anthropic Claude API."""
+    """Call Anthropic Claude API (streamed SSE, concatenated)."""
     messages = [{"role": "user", "content": prompt}]
     payload = {
         "model": Config.ANTHROPIC_MODEL,
         "max_tokens": 4096,
         "messages": messages,
+        "stream": True,
     }
 
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": Config.ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            },
-            json=payload
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        text_blocks = [b["text"] for b in data.get("content", []) if b.get("type") == "text"]
-        return "\n".join(text_blocks)
+    parts = []
+    async with _get_llm_client().stream(
+        "POST",
+        "https://api.anthropic.com/v1/messages",
+        headers={
+            "x-api-key": Config.ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        },
+        content=orjson.dumps(payload)
+    ) as resp:
+        await _raise_stream_error(resp)
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = orjson.loads(line[6:])
+            if event.get("type") == "content_block_delta":
+                delta = event.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    parts.append(delta.get("text", ""))
+    return "".join(parts)
 
 
 async def _xai_generate(prompt: str, json_mode: bool = False) -> str:
-    """Call xAI Grok API (OpenAI-compatible)."""
+    """Call xAI Grok API (OpenAI-compatible, streamed SSE)."""
     messages = [{"role": "user", "content": prompt}]
     payload = {
         "model": Config.XAI_MODEL,
         "max_tokens": 4096,
         "messages": messages,
+        "stream": True,
     }
     if json_mode:
         payload["response_format"] = {"type": "json_object"}
 
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(
-            "https://api.x.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {Config.XAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json=payload
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"]
+    parts = []
+    async with _get_llm_client().stream(
+        "POST",
+        "https://api.x.ai/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {Config.XAI_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        content=orjson.dumps(payload)
+    ) as resp:
+        await _raise_stream_error(resp)
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            choices = orjson.loads(data).get("choices")
+            if choices:
+                parts.append(choices[0].get("delta", {}).get("content") or "")
+    return "".join(parts)
 
 
 async def _ollama_generate(prompt: str, json_mode: bool = False) -> str:
-    """Call local Ollama instance."""
+    """Call local Ollama instance (streamed NDJSON)."""
     payload = {
         "model": Config.OLLAMA_MODEL,
         "prompt": prompt,
-        "stream": False,
+        "stream": True,
     }
     if json_mode:
         payload["format"] = "json"
 
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(f"{Config.OLLAMA_URL}/api/generate", json=payload)
-        resp.raise_for_status()
-        return resp.json().get("response", "")
+    parts = []
+    async with _get_llm_client().stream(
+        "POST", f"{Config.OLLAMA_URL}/api/generate",
+        headers={"Content-Type": "application/json"},
+        content=orjson.dumps(payload)
+    ) as resp:
+        await _raise_stream_error(resp)
+        async for line in resp.aiter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            parts.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                break
+    return "".join(parts)
+
+
+# Changed paths come straight out of the diff headers — cheap to scan
+# before paying for an LLM round-trip. These suffixes/prefixes cover the
+# pushes analyze_diff would dismiss anyway: docs, lockfiles, CI config,
+# and test-only changes.
+_DIFF_PATH_RE = re.compile(r'^diff --git a/(\S+) b/\S+', re.M)
+_NON_CODE_SUFFIXES = (".md", ".mdx", ".rst", ".txt", ".lock", ".yml", ".yaml")
+_NON_CODE_PREFIXES = (".github/", "docs/", "tests/", "test/")
+
+
+def _is_non_code_path(path: str) -> bool:
+    return path.endswith(_NON_CODE_SUFFIXES) or path.startswith(_NON_CODE_PREFIXES)
 
 
 async def analyze_diff(diff_text: str) -> list[dict]:
     """Analyze a git diff and identify doc-relevant changes."""
-    truncated = diff_text[:Config.MAX_DIFF_SIZE]
+    # Doc-only, lockfile-only, and CI-only pushes are the bulk of webhook
+    # traffic on a busy repo; dismiss them from the headers alone.
+    paths = _DIFF_PATH_RE.findall(diff_text)
+    if paths and all(_is_non_code_path(p) for p in paths):
+        log.info("Skipped non-code diff (%d files)", len(paths))
+        return []
+
+    # Slicing copies, and most diffs fit the budget — only pay for the copy
+    # when the diff actually needs truncating.
+    if len(diff_text) <= Config.MAX_DIFF_SIZE:
+        truncated = diff_text
+    else:
+        truncated = diff_text[:Config.MAX_DIFF_SIZE]
 
     prompt = f"""You are a documentation analyst. Analyze this git diff and identify changes that need documentation updates.
 
@@ -122,21 +244,26 @@ Diff:
     text = await llm_generate(prompt, json_mode=True)
 
     try:
-        data = json.loads(text)
-        if isinstance(data, dict):
-            return data.get("changes", [])
-        if isinstance(data, list):
-            return data
-        return []
-    except json.JSONDecodeError:
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group())
-            except json.JSONDecodeError:
-                pass
-        log.warning("Failed to parse LLM response as JSON: %s", text[:200])
-        return []
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return _salvage_changes(text)
+    if isinstance(data, dict):
+        return data.get("changes", [])
+    if isinstance(data, list):
+        return data
+    return []
+
+
+def _salvage_changes(text: str) -> list[dict]:
+    """Last-ditch parse of a non-JSON LLM reply: pull out a bracketed array."""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if match:
+        try:
+            return orjson.loads(match.group())
+        except orjson.JSONDecodeError:
+            pass
+    log.warning("Failed to parse LLM response as JSON: %s", text[:200])
+    return []
 
 
 async def find_doc_gaps(changes: list[dict], doc_files: dict[str, str]) -> list[dict]:
@@ -144,7 +271,10 @@ async def find_doc_gaps(changes: list[dict], doc_files: dict[str, str]) -> list[
     if not changes:
         return []
 
-    all_docs_lower = "\n".join(doc_files.values()).lower()
+    # Tokenize the doc corpus once up front — each term check becomes an O(1)
+    # set lookup instead of a substring scan over megabytes of docs, and this
+    # all runs on the event loop thread.
+    doc_tokens = set(_TERM_RE.findall("\n".join(doc_files.values()).lower()))
     gaps = []
 
     for change in changes:
@@ -158,7 +288,7 @@ async def find_doc_gaps(changes: list[dict], doc_files: dict[str, str]) -> list[
             continue
 
         # Check how many terms appear in existing docs
-        hits = sum(1 for t in terms if t in all_docs_lower)
+        hits = sum(1 for t in terms if t in doc_tokens)
         coverage = hits / len(terms)
 
         if coverage < 0.4:
@@ -168,34 +298,44 @@ async def find_doc_gaps(changes: list[dict], doc_files: dict[str, str]) -> list[
     return gaps
 
 
+# Hoisted out of _extract_terms: it sits in the hot loop under
+# find_doc_gaps, and rebuilding a 30-odd element set per call (plus the
+# regex-cache lookup) adds up across hundreds of changes.
+_TERM_RE = re.compile(r'[a-z_][a-z0-9_]{2,}')
+_STOP = frozenset({
+    'the', 'a', 'an', 'in', 'to', 'for', 'of', 'and', 'or', 'is', 'was',
+    'with', 'that', 'this', 'add', 'added', 'new', 'update', 'change',
+    'changed', 'remove', 'removed', 'function', 'method', 'class', 'file',
+    'now', 'can', 'has', 'have', 'been', 'from', 'will', 'are', 'not',
+})
+
+
 def _extract_terms(text: str) -> list[str]:
     """Extract key terms for doc coverage matching."""
-    stop = {
-        'the', 'a', 'an', 'in', 'to', 'for', 'of', 'and', 'or', 'is', 'was',
-        'with', 'that', 'this', 'add', 'added', 'new', 'update', 'change',
-        'changed', 'remove', 'removed', 'function', 'method', 'class', 'file',
-        'now', 'can', 'has', 'have', 'been', 'from', 'will', 'are', 'not',
-    }
-    words = re.findall(r'[a-z_][a-z0-9_]{2,}', text.lower())
-    return [w for w in words if w not in stop]
+    return [w for w in _TERM_RE.findall(text.lower()) if w not in _STOP]
+
+
+def _resolve_target_doc(source_file: str, doc_files: dict[str, str]) -> str | None:
+    """Find the existing doc file that covers a source module, if any."""
+    base_name = source_file.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
+    for doc_path in doc_files:
+        doc_basename = doc_path.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
+        if base_name == doc_basename or base_name in doc_basename:
+            return doc_path
+    return None
 
 
 async def generate_doc_update(gap: dict, doc_files: dict[str, str],
                                diff_context: str) -> dict:
     """Generate documentation content for a single gap.
 
-    Returns: {filename, content, is_new, gap}
+    Returns: {filename, content, is_new, gaps}
     """
     source_file = gap.get("file", "unknown")
     base_name = source_file.rsplit("/", 1)[-1].rsplit(".", 1)[0]
 
     # Find existing doc file for this module
-    target_doc = None
-    for doc_path in doc_files:
-        doc_basename = doc_path.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
-        if base_name.lower() == doc_basename or base_name.lower() in doc_basename:
-            target_doc = doc_path
-            break
+    target_doc = _resolve_target_doc(source_file, doc_files)
 
     if target_doc and target_doc in doc_files:
         existing = doc_files[target_doc][:Config.MAX_DOC_CONTEXT]
@@ -255,7 +395,54 @@ Output only markdown."""
         "filename": target_doc,
         "content": content.strip(),
         "is_new": is_new,
-        "gap": gap,
+        "gaps": [gap],
+    }
+
+
+async def generate_batched_doc_update(target_doc: str, gaps: list[dict],
+                                      doc_files: dict[str, str],
+                                      diff_context: str) -> dict:
+    """Generate one update to an existing doc covering several gaps at once.
+
+    One completion instead of len(gaps), and no last-writer-wins race from
+    generating the same file twice in parallel.
+
+    Returns: {filename, content, is_new, gaps}
+    """
+    existing = doc_files[target_doc][:Config.MAX_DOC_CONTEXT]
+    changes = "\n".join(
+        f"{i}) Source file: {g.get('file', 'unknown')}\n"
+        f"   Type: {g.get('change_type', 'unknown')}\n"
+        f"   Summary: {g.get('summary', '')}\n"
+        f"   Details: {g.get('details', '')}"
+        for i, g in enumerate(gaps, 1)
+    )
+
+    prompt = f"""Update this documentation to cover all of the following changes.
+
+Existing doc ({target_doc}):
+```markdown
+{existing}
+```
+
+Changes to document:
+{changes}
+
+Diff context:
+```
+{diff_context[:2000]}
+```
+
+Write the COMPLETE updated document. Keep existing content, add coverage for every change above.
+Match the existing style and structure exactly. Output only the markdown."""
+
+    content = await llm_generate(prompt)
+
+    return {
+        "filename": target_doc,
+        "content": content.strip(),
+        "is_new": False,
+        "gaps": gaps,
     }
 
 
@@ -277,20 +464,33 @@ async def process_push(project_id: str, before: str, after: str):
     db.log_activity(project_id, "push_received",
                     f"Push received: {before[:7]}..{after[:7]}")
 
-    # 1. Get the diff
-    try:
-        diff_text = await gh.get_push_diff(owner, repo, before, after, token=token)
-    except Exception as e:
-        log.error("Failed to get diff: %s", e)
-        db.log_activity(project_id, "error", f"Failed to get diff: {e}")
-        return
+    # A SHA pair names an immutable compare, so webhook redeliveries and
+    # manual reprocessing reuse both the diff text and its analysis.
+    cache_key = f"{owner}/{repo}:{before}..{after}"
+    changes = None
+    cached = db.get_diff_analysis(cache_key)
+    if cached:
+        diff_text = cached[0]
+        if cached[1] is not None:
+            changes = orjson.loads(cached[1])
+    else:
+        # 1. Get the diff
+        try:
+            diff_text = await gh.get_push_diff(owner, repo, before, after, token=token)
+        except Exception as e:
+            log.error("Failed to get diff: %s", e)
+            db.log_activity(project_id, "error", f"Failed to get diff: {e}")
+            return
+        db.set_push_diff(cache_key, diff_text)
 
     if not diff_text.strip():
         db.log_activity(project_id, "no_changes", "Push had no meaningful diff")
         return
 
     # 2. Analyze for doc-relevant changes
-    changes = await analyze_diff(diff_text)
+    if changes is None:
+        changes = await analyze_diff(diff_text)
+        db.set_diff_analysis(cache_key, orjson.dumps(changes).decode())
     if not changes:
         db.log_activity(project_id, "no_doc_changes",
                         "No documentation-relevant changes detected")
@@ -298,7 +498,7 @@ async def process_push(project_id: str, before: str, after: str):
 
     db.log_activity(project_id, "changes_detected",
                     f"Found {len(changes)} doc-relevant changes",
-                    json.dumps(changes, indent=2))
+                    orjson.dumps(changes, option=orjson.OPT_INDENT_2).decode())
 
     # 3. Get existing docs
     doc_files = await gh.get_all_doc_files(owner, repo, docs_path, token=token)
@@ -312,24 +512,52 @@ async def process_push(project_id: str, before: str, after: str):
 
     db.log_activity(project_id, "gaps_found",
                     f"Found {len(gaps)} documentation gaps",
-                    json.dumps(gaps, indent=2))
+                    orjson.dumps(gaps, option=orjson.OPT_INDENT_2).decode())
+
+    # 5. Generate docs for each gap. Record the gap rows up front in one
+    # transaction, then fan the generations out concurrently — each one is
+    # pure I/O wait on the LLM, so N gaps cost roughly one LLM round-trip
+    # instead of N. The semaphore keeps bursts under provider rate limits.
+    gap_ids = db.create_gaps_bulk(project_id, [
+        (g.get("file", "unknown"), g.get("change_type", "unknown"), g.get("summary", ""))
+        for g in gaps])
+    for gap, gap_id in zip(gaps, gap_ids):
+        gap["_db_id"] = gap_id
 
-    # 5. Generate docs for each gap
-    doc_updates = []
+    sem = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+
+    # Gaps that resolve to the same existing doc share one batched
+    # completion; the rest generate individually.
+    by_target: dict[str, list[dict]] = {}
+    singles: list[dict] = []
     for gap in gaps:
-        gap_id = db.create_gap(
-            project_id, gap.get("file", "unknown"),
-            gap.get("change_type", "unknown"),
-            gap.get("summary", "")
-        )
-        gap["_db_id"] = gap_id
+        target = _resolve_target_doc(gap.get("file", "unknown"), doc_files)
+        if target:
+            by_target.setdefault(target, []).append(gap)
+        else:
+            singles.append(gap)
+
+    async def _gen(gap: dict) -> dict:
+        async with sem:
+            return await generate_doc_update(gap, doc_files, diff_text)
+
+    async def _gen_batch(target: str, group: list[dict]) -> dict:
+        if len(group) == 1:
+            return await _gen(group[0])
+        async with sem:
+            return await generate_batched_doc_update(target, group, doc_files, diff_text)
+
+    jobs = [([g], _gen(g)) for g in singles]
+    jobs += [(group, _gen_batch(target, group)) for target, group in by_target.items()]
+    results = await asyncio.gather(*(coro for _, coro in jobs), return_exceptions=True)
 
-        try:
-            update = await generate_doc_update(gap, doc_files, diff_text)
-            if update["content"]:
-                doc_updates.append(update)
-        except Exception as e:
-            log.error("Failed to generate doc for gap %s: %s", gap_id, e)
+    doc_updates = []
+    for (covered, _), result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            log.error("Failed to generate doc for gaps %s: %s",
+                      [g["_db_id"] for g in covered], result)
+        elif result["content"]:
+            doc_updates.append(result)
 
     if not doc_updates:
         db.log_activity(project_id, "generation_failed", "Doc generation produced no content")
@@ -342,12 +570,9 @@ async def process_push(project_id: str, before: str, after: str):
                         f"PR #{result['number']}: {result['title']}",
                         result["url"])
 
-        for update in doc_updates:
-            gap = update["gap"]
-            if "_db_id" in gap:
-                db.update_gap(gap["_db_id"], "pr_opened",
-                              pr_number=result["number"], pr_url=result["url"],
-                              doc_file=update["filename"])
+        db.update_gaps_bulk(project_id, [
+            (gap["_db_id"], "pr_opened", result["number"], result["url"], update["filename"])
+            for update in doc_updates for gap in update["gaps"] if "_db_id" in gap])
 
     except Exception as e:
         log.error("Failed to create PR: %s", e)
@@ -382,15 +607,19 @@ async def scan_repo(project_id: str):
         and f["path"].endswith((".py", ".js", ".ts", ".go", ".rs", ".java", ".rb", ".php"))
     ]
 
-    # Check each source file for doc coverage
-    all_doc_text = "\n".join(doc_files.values()).lower()
+    # Check each source file for doc coverage. Lowercase the doc paths once
+    # and tokenize the corpus once — the per-file checks drop from a
+    # full-corpus substring scan (plus re-lowercasing every path) to a list
+    # walk and a set lookup.
+    doc_paths_lower = [dp.lower() for dp in doc_files]
+    doc_tokens = set(_TERM_RE.findall("\n".join(doc_files.values()).lower()))
     uncovered = []
 
     for sf in source_files:
         basename = sf["path"].rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()
         # Check if this module has any documentation
-        has_doc = any(basename in dp.lower() for dp in doc_files)
-        mentioned = basename in all_doc_text
+        has_doc = any(basename in dp for dp in doc_paths_lower)
+        mentioned = basename in doc_tokens
 
         if not has_doc and not mentioned:
             uncovered.append(sf["path"])
@@ -399,12 +628,13 @@ async def scan_repo(project_id: str):
     coverage_pct = round((1 - len(uncovered) / max(len(source_files), 1)) * 100, 1)
     db.log_activity(project_id, "scan_complete",
                     f"Scan complete: {coverage_pct}% coverage ({len(source_files)} source files, {len(uncovered)} undocumented)",
-                    json.dumps({"uncovered": uncovered, "total_source": len(source_files),
-                               "total_docs": len(doc_files), "coverage_pct": coverage_pct}))
+                    orjson.dumps({"uncovered": uncovered, "total_source": len(source_files),
+                                  "total_docs": len(doc_files),
+                                  "coverage_pct": coverage_pct}).decode())
 
-    for path in uncovered:
-        db.create_gap(project_id, path, "missing_doc",
-                      f"Source file {path} has no corresponding documentation")
+    db.create_gaps_bulk(project_id, [
+        (path, "missing_doc", f"Source file {path} has no corresponding documentation")
+        for path in uncovered])
 
     return {
         "coverage_pct": coverage_pct,
@@ -429,24 +659,28 @@ async def _create_doc_pr(owner: str, repo: str, base_branch: str,
     if not created:
         raise RuntimeError(f"Failed to create branch {branch_name}")
 
-    # Commit each doc file
-    files_changed = []
-    for update in doc_updates:
-        path = update["filename"]
-        existing_sha = await gh.get_file_sha(owner, repo, path, branch_name, token=token)
-
-        action = "Update" if existing_sha else "Add"
-        msg = f"docs: {action.lower()} {path}\n\n{update['gap'].get('summary', 'Documentation update')}\n\nGenerated by Tome"
-
-        await gh.create_or_update_file(
-            owner, repo, path, update["content"], msg, branch_name, existing_sha, token=token
-        )
-        files_changed.append(f"- {'Updated' if existing_sha else 'Created'}: `{path}`")
+    # Commit every doc file atomically: blobs + tree + commit + ref update
+    # via the Git Data API, instead of one Contents-API commit per file.
+    # is_new already says whether the doc existed, so no SHA lookups either.
+    summaries = "\n".join(
+        f"- {g.get('summary', 'Documentation update')}"
+        for u in doc_updates for g in u["gaps"])
+    msg = f"docs: update documentation\n\n{summaries}\n\nGenerated by Tome"
+
+    await gh.commit_files(
+        owner, repo, branch_name, base_sha,
+        [(u["filename"], u["content"]) for u in doc_updates],
+        msg, token=token)
+
+    files_changed = [
+        f"- {'Created' if u['is_new'] else 'Updated'}: `{u['filename']}`"
+        for u in doc_updates
+    ]
 
     # Build PR body
     changes_summary = "\n".join(
-        f"- **{u['gap'].get('change_type', 'change')}** in `{u['gap'].get('file', '?')}`: {u['gap'].get('summary', '')}"
-        for u in doc_updates
+        f"- **{g.get('change_type', 'change')}** in `{g.get('file', '?')}`: {g.get('summary', '')}"
+        for u in doc_updates for g in u["gaps"]
     )
     files_list = "\n".join(files_changed)
 
@@ -6,15 +6,41 @@ creating branches, committing files, and opening PRs.
 All functions accept an optional `token` param. If not provided,
 falls back to Config.GITHUB_TOKEN (for backward compat / dev).
 """
+import asyncio
 import httpx
 import base64
 import hashlib
 import hmac
+import orjson
 from datetime import datetime
+from urllib.parse import urlencode
 from config import Config
+import db
 
 API = "https://api.github.com"
 
+# One pooled client for all GitHub calls — keep-alive reuses the TCP+TLS
+# session instead of a fresh handshake per request, which dominates wall time
+# when a doc walk or PR issues dozens of calls. Built lazily so importing
+# this module never opens sockets; closed via aclose() from the app lifespan.
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=API, timeout=30,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50))
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 def _headers(token: str = None) -> dict:
     t = token or Config.GITHUB_TOKEN
@@ -25,57 +51,100 @@ def _headers(token: str = None) -> dict:
     }
 
 
+def _write_headers(token: str = None) -> dict:
+    """Headers for requests that ship a pre-serialized orjson body.
+
+    Passing content= bytes skips httpx's stdlib-json encoding of json=
+    payloads, which is measurable on big base64 blobs and PR bodies."""
+    h = _headers(token)
+    h["Content-Type"] = "application/json"
+    return h
+
+
+# HMAC prototype with the key schedule already initialized (same pattern as
+# billing): per-call verification copies it and compares raw digest bytes,
+# with no hex or prefix string allocations.
+_WEBHOOK_HMAC_PROTO = (hmac.new(Config.GITHUB_WEBHOOK_SECRET_BYTES, digestmod=hashlib.sha256)
+                       if Config.GITHUB_WEBHOOK_SECRET else None)
+
+
 def verify_webhook_signature(payload: bytes, signature: str) -> bool:
-    if not Config.GITHUB_WEBHOOK_SECRET:
+    if _WEBHOOK_HMAC_PROTO is None:
         return True  # no secret configured, skip verification (dev mode)
-    expected = "sha256=" + hmac.new(
-        Config.GITHUB_WEBHOOK_SECRET.encode(), payload, hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(expected, signature)
+    if not signature.startswith("sha256="):
+        return False
+    try:
+        provided = bytes.fromhex(signature[7:])
+    except ValueError:
+        return False
+    mac = _WEBHOOK_HMAC_PROTO.copy()
+    mac.update(payload)
+    return len(provided) == 32 and hmac.compare_digest(mac.digest(), provided)
+
+
+async def _conditional_get(path: str, headers: dict, params: dict = None,
+                           ok404: bool = False) -> str | None:
+    """GET with If-None-Match from the ETag cache.
+
+    GitHub answers a matching etag with a 304 that costs nothing against
+    the rate limit; the cached body comes back as if it were a fresh 200.
+    Returns the body text, or None on 404 when ok404 is set; other error
+    statuses raise as usual.
+    """
+    key = f"{path}?{urlencode(params)}" if params else path
+    cached = db.etag_get(key)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+    resp = await get_client().get(path, headers=headers, params=params)
+    if resp.status_code == 304 and cached:
+        return cached[1]
+    if resp.status_code == 404 and ok404:
+        return None
+    resp.raise_for_status()
+    etag = resp.headers.get("etag")
+    if etag:
+        db.etag_put(key, etag, resp.text)
+    return resp.text
 
 
 async def get_repo_info(owner: str, repo: str, token: str = None) -> dict:
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(f"{API}/repos/{owner}/{repo}", headers=_headers(token))
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().get(f"/repos/{owner}/{repo}", headers=_headers(token))
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def get_compare(owner: str, repo: str, base: str, head: str, token: str = None) -> dict:
     """Get diff between two commits."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/compare/{base}...{head}",
-            headers=_headers(token)
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}/compare/{base}...{head}",
+        headers=_headers(token)
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def get_commit_diff(owner: str, repo: str, sha: str, token: str = None) -> str:
     """Get the patch/diff for a specific commit."""
     headers = _headers(token)
     headers["Accept"] = "application/vnd.github.v3.diff"
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/commits/{sha}",
-            headers=headers
-        )
-        resp.raise_for_status()
-        return resp.text
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}/commits/{sha}",
+        headers=headers
+    )
+    resp.raise_for_status()
+    return resp.text
 
 
 async def get_push_diff(owner: str, repo: str, before: str, after: str, token: str = None) -> str:
     """Get combined diff for a push (multiple commits)."""
     headers = _headers(token)
     headers["Accept"] = "application/vnd.github.v3.diff"
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/compare/{before}...{after}",
-            headers=headers
-        )
-        resp.raise_for_status()
-        return resp.text
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}/compare/{before}...{after}",
+        headers=headers
+    )
+    resp.raise_for_status()
+    return resp.text
 
 
 async def list_directory(owner: str, repo: str, path: str, ref: str = None, token: str = None) -> list[dict]:
@@ -83,88 +152,122 @@ async def list_directory(owner: str, repo: str, path: str, ref: str = None, toke
     params = {}
     if ref:
         params["ref"] = ref
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/contents/{path}",
-            headers=_headers(token),
-            params=params
-        )
-        if resp.status_code == 404:
-            return []
-        resp.raise_for_status()
-        data = resp.json()
-        return data if isinstance(data, list) else [data]
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}/contents/{path}",
+        headers=_headers(token),
+        params=params
+    )
+    if resp.status_code == 404:
+        return []
+    resp.raise_for_status()
+    data = resp.json()
+    return data if isinstance(data, list) else [data]
 
 
 async def get_file_content(owner: str, repo: str, path: str, ref: str = None, token: str = None) -> str | None:
     """Get decoded content of a file."""
-    params = {}
-    if ref:
-        params["ref"] = ref
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/contents/{path}",
-            headers=_headers(token),
-            params=params
-        )
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
-        data = resp.json()
-        if data.get("encoding") == "base64":
-            return base64.b64decode(data["content"]).decode("utf-8", errors="replace")
-        return data.get("content", "")
+    params = {"ref": ref} if ref else None
+    body = await _conditional_get(
+        f"/repos/{owner}/{repo}/contents/{path}",
+        _headers(token), params=params, ok404=True
+    )
+    if body is None:
+        return None
+    data = orjson.loads(body)
+    if data.get("encoding") == "base64":
+        return await _b64decode_text(data["content"])
+    return data.get("content", "")
 
 
-async def get_all_doc_files(owner: str, repo: str, docs_path: str, ref: str = None, token: str = None) -> dict[str, str]:
-    """Recursively get all markdown files in docs directory. Returns {path: content}."""
-    result = {}
-    await _walk_docs(owner, repo, docs_path.rstrip("/"), ref, result, token)
-    return result
+_DOC_EXTENSIONS = (".md", ".mdx", ".rst", ".txt")
+
+# Above this size, base64 transcoding is worth a thread hop so the event
+# loop stays responsive while fan-out requests are in flight; below it the
+# hop costs more than the work.
+_OFFLOAD_BYTES = 16 * 1024
 
 
-async def _walk_docs(owner: str, repo: str, path: str, ref: str, result: dict, token: str = None):
-    items = await list_directory(owner, repo, path, ref, token)
-    for item in items:
-        if item["type"] == "dir":
-            await _walk_docs(owner, repo, item["path"], ref, result, token)
-        elif item["type"] == "file" and item["name"].endswith((".md", ".mdx", ".rst", ".txt")):
-            content = await get_file_content(owner, repo, item["path"], ref, token)
-            if content:
-                result[item["path"]] = content
+async def _b64encode_str(content: str) -> str:
+    raw = content.encode()
+    if len(raw) > _OFFLOAD_BYTES:
+        return (await asyncio.to_thread(base64.b64encode, raw)).decode()
+    return base64.b64encode(raw).decode()
+
+
+async def _b64decode_text(data: str) -> str:
+    if len(data) > _OFFLOAD_BYTES:
+        return await asyncio.to_thread(
+            lambda: base64.b64decode(data).decode("utf-8", errors="replace"))
+    return base64.b64decode(data).decode("utf-8", errors="replace")
+
+
+async def get_all_doc_files(owner: str, repo: str, docs_path: str, ref: str = None, token: str = None) -> dict[str, str]:
+    """Get all doc files under a directory, recursively. Returns {path: content}.
+
+    One recursive tree call replaces the per-directory Contents listings —
+    O(1) requests to discover the whole docs tree regardless of depth — and
+    the matching blobs are fetched concurrently. The semaphore keeps a huge
+    docs tree from flooding the connection pool.
+    """
+    prefix = docs_path.rstrip("/") + "/"
+    tree = await get_tree(owner, repo, ref or "HEAD", token=token)
+    entries = [
+        e for e in tree
+        if e["type"] == "blob"
+        and e["path"].startswith(prefix)
+        and e["path"].endswith(_DOC_EXTENSIONS)
+    ]
+
+    sem = asyncio.Semaphore(20)
+
+    async def _read(sha: str) -> str | None:
+        async with sem:
+            return await get_blob_text(owner, repo, sha, token)
+
+    contents = await asyncio.gather(*(_read(e["sha"]) for e in entries))
+    return {e["path"]: content for e, content in zip(entries, contents) if content}
+
+
+async def get_blob_text(owner: str, repo: str, sha: str, token: str = None) -> str | None:
+    """Get decoded content of a blob by SHA."""
+    body = await _conditional_get(
+        f"/repos/{owner}/{repo}/git/blobs/{sha}",
+        _headers(token), ok404=True
+    )
+    if body is None:
+        return None
+    data = orjson.loads(body)
+    if data.get("encoding") == "base64":
+        return await _b64decode_text(data["content"])
+    return data.get("content", "")
 
 
 async def get_tree(owner: str, repo: str, ref: str = "HEAD", token: str = None) -> list[dict]:
     """Get full file tree of a repo (recursive)."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/git/trees/{ref}?recursive=1",
-            headers=_headers(token)
-        )
-        resp.raise_for_status()
-        return resp.json().get("tree", [])
+    body = await _conditional_get(
+        f"/repos/{owner}/{repo}/git/trees/{ref}?recursive=1",
+        _headers(token)
+    )
+    return orjson.loads(body).get("tree", [])
 
 
 async def get_default_branch_sha(owner: str, repo: str, branch: str, token: str = None) -> str:
     """Get the latest commit SHA of a branch."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/git/refs/heads/{branch}",
-            headers=_headers(token)
-        )
-        resp.raise_for_status()
-        return resp.json()["object"]["sha"]
+    body = await _conditional_get(
+        f"/repos/{owner}/{repo}/git/refs/heads/{branch}",
+        _headers(token)
+    )
+    return orjson.loads(body)["object"]["sha"]
 
 
 async def create_branch(owner: str, repo: str, branch_name: str, from_sha: str, token: str = None) -> bool:
     """Create a new branch from a commit SHA."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API}/repos/{owner}/{repo}/git/refs",
-            headers=_headers(token),
-            json={"ref": f"refs/heads/{branch_name}", "sha": from_sha}
-        )
-        return resp.status_code == 201
+    resp = await get_client().post(
+        f"/repos/{owner}/{repo}/git/refs",
+        headers=_write_headers(token),
+        content=orjson.dumps({"ref": f"refs/heads/{branch_name}", "sha": from_sha})
+    )
+    return resp.status_code == 201
 
 
 async def create_or_update_file(owner: str, repo: str, path: str, content: str,
@@ -172,78 +275,126 @@ async def create_or_update_file(owner: str, repo: str, path: str, content: str,
     """Create or update a file in the repo."""
     payload = {
         "message": message,
-        "content": base64.b64encode(content.encode()).decode(),
+        "content": await _b64encode_str(content),
         "branch": branch,
     }
     if sha:
         payload["sha"] = sha
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.put(
-            f"{API}/repos/{owner}/{repo}/contents/{path}",
-            headers=_headers(token),
-            json=payload
+    resp = await get_client().put(
+        f"/repos/{owner}/{repo}/contents/{path}",
+        headers=_headers(token),
+        json=payload
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def commit_files(owner: str, repo: str, branch: str, base_sha: str,
+                       files: list[tuple[str, str]], message: str, token: str = None) -> str:
+    """Commit several files to a branch as one commit via the Git Data API.
+
+    The Contents API forces one commit (and two round-trips) per file; here
+    the blobs upload concurrently, then one tree, one commit, and one ref
+    update land everything — ~4 calls regardless of file count, and the
+    branch history gets a single atomic commit. Returns the commit SHA.
+    """
+    headers = _write_headers(token)
+    client = get_client()
+
+    async def _blob(content: str) -> str:
+        resp = await client.post(
+            f"/repos/{owner}/{repo}/git/blobs",
+            headers=headers,
+            content=orjson.dumps({"content": await _b64encode_str(content),
+                                  "encoding": "base64"})
         )
         resp.raise_for_status()
-        return resp.json()
+        return resp.json()["sha"]
+
+    blob_shas = await asyncio.gather(*(_blob(content) for _, content in files))
+
+    resp = await client.post(
+        f"/repos/{owner}/{repo}/git/trees",
+        headers=headers,
+        content=orjson.dumps(
+            {"base_tree": base_sha,
+             "tree": [{"path": path, "mode": "100644", "type": "blob", "sha": sha}
+                      for (path, _), sha in zip(files, blob_shas)]})
+    )
+    resp.raise_for_status()
+    tree_sha = resp.json()["sha"]
+
+    resp = await client.post(
+        f"/repos/{owner}/{repo}/git/commits",
+        headers=headers,
+        content=orjson.dumps({"message": message, "tree": tree_sha, "parents": [base_sha]})
+    )
+    resp.raise_for_status()
+    commit_sha = resp.json()["sha"]
+
+    resp = await client.patch(
+        f"/repos/{owner}/{repo}/git/refs/heads/{branch}",
+        headers=headers,
+        content=orjson.dumps({"sha": commit_sha})
+    )
+    resp.raise_for_status()
+    return commit_sha
 
 
 async def get_file_sha(owner: str, repo: str, path: str, branch: str, token: str = None) -> str | None:
     """Get the SHA of an existing file (needed for updates)."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}/contents/{path}",
-            headers=_headers(token),
-            params={"ref": branch}
-        )
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
-        return resp.json().get("sha")
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}/contents/{path}",
+        headers=_headers(token),
+        params={"ref": branch}
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json().get("sha")
 
 
 async def create_pull_request(owner: str, repo: str, title: str, body: str,
                                head: str, base: str, token: str = None) -> dict:
     """Create a pull request."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API}/repos/{owner}/{repo}/pulls",
-            headers=_headers(token),
-            json={"title": title, "body": body, "head": head, "base": base}
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().post(
+        f"/repos/{owner}/{repo}/pulls",
+        headers=_write_headers(token),
+        content=orjson.dumps({"title": title, "body": body, "head": head, "base": base})
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def create_webhook(owner: str, repo: str, token: str = None) -> dict:
     """Create a webhook on the repo to receive push and PR events."""
     webhook_url = f"{Config.BASE_URL}/api/webhook/github"
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API}/repos/{owner}/{repo}/hooks",
-            headers=_headers(token),
-            json={
-                "name": "web",
-                "active": True,
-                "events": ["push", "pull_request"],
-                "config": {
-                    "url": webhook_url,
-                    "content_type": "json",
-                    "secret": Config.GITHUB_WEBHOOK_SECRET or "",
-                    "insecure_ssl": "0",
-                },
+    resp = await get_client().post(
+        f"/repos/{owner}/{repo}/hooks",
+        headers=_write_headers(token),
+        content=orjson.dumps({
+            "name": "web",
+            "active": True,
+            "events": ["push", "pull_request"],
+            "config": {
+                "url": webhook_url,
+                "content_type": "json",
+                "secret": Config.GITHUB_WEBHOOK_SECRET or "",
+                "insecure_ssl": "0",
             },
-        )
-        resp.raise_for_status()
-        return resp.json()
+        }),
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def verify_repo_access(owner: str, repo: str, token: str) -> dict:
     """Verify we can access the repo with the given token. Returns repo info or raises."""
-    async with httpx.AsyncClient(timeout=15) as client:
-        resp = await client.get(
-            f"{API}/repos/{owner}/{repo}",
-            headers=_headers(token),
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().get(
+        f"/repos/{owner}/{repo}",
+        headers=_headers(token),
+        timeout=15,
+    )
+    resp.raise_for_status()
+    return resp.json()
@@ -0,0 +1,56 @@
+"""Token-bucket pacing for LLM calls.
+
+Providers meter requests per minute and tokens per minute separately, and
+a concurrent fan-out (gather over many gaps) trips 429s on burst long
+before average throughput is a problem. Each backend gets one bucket pair
+that refills continuously against the wall clock; acquire() sleeps exactly
+long enough for the deficit to refill, so calls are paced up front instead
+of retried after the provider pushes back.
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Dual-rate limiter: requests/minute and tokens/minute.
+
+    A rate of 0 disables that limit (e.g. local Ollama).
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm:
+            self._requests = min(float(self.rpm),
+                                 self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(float(self.tpm),
+                               self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, est_tokens: int = 0):
+        """Block until one request plus est_tokens fit in the bucket."""
+        while True:
+            async with self._lock:
+                self._refill()
+                waits = []
+                if self.rpm and self._requests < 1.0:
+                    waits.append((1.0 - self._requests) * 60.0 / self.rpm)
+                if self.tpm and self._tokens < est_tokens:
+                    waits.append((est_tokens - self._tokens) * 60.0 / self.tpm)
+                if not waits:
+                    if self.rpm:
+                        self._requests -= 1.0
+                    if self.tpm:
+                        self._tokens -= est_tokens
+                    return
+                wait = max(waits)
+            await asyncio.sleep(wait)
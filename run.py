@@ -5,4 +5,7 @@ from db import init_db
 
 if __name__ == "__main__":
     init_db()
-    uvicorn.run("app:app", host=Config.HOST, port=Config.PORT, reload=False)
+    # uvloop + httptools beat the default asyncio/h11 stack by ~2x on
+    # request-heavy workloads; pin them so uvicorn can't silently fall back.
+    uvicorn.run("app:app", host=Config.HOST, port=Config.PORT, reload=False,
+                loop="uvloop", http="httptools", workers=Config.UVICORN_WORKERS)
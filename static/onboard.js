@@ -0,0 +1,40 @@
+async function submitOnboarding(e) {
+  e.preventDefault();
+  const form = e.target;
+  const btn = document.getElementById('submit-btn');
+  const errEl = document.getElementById('error-msg');
+  errEl.style.display = 'none';
+  btn.disabled = true;
+  btn.textContent = 'Connecting...';
+
+  const data = {
+    email: form.email.value,
+    github_owner: form.github_owner.value,
+    github_repo: form.github_repo.value,
+    github_token: form.github_token.value,
+    docs_paths: form.docs_paths.value,
+    source_paths: form.source_paths.value,
+    default_branch: form.default_branch.value,
+  };
+
+  try {
+    const resp = await fetch('/api/onboard', {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify(data)
+    });
+    const result = await resp.json();
+    if (!resp.ok) {
+      throw new Error(result.detail || 'Setup failed');
+    }
+    document.getElementById('form-view').style.display = 'none';
+    document.getElementById('success-view').style.display = 'block';
+    document.getElementById('project-info').textContent =
+      'Project ID: ' + result.project_id + ' | API Key: ' + result.api_key;
+  } catch (err) {
+    errEl.textContent = err.message;
+    errEl.style.display = 'block';
+    btn.disabled = false;
+    btn.textContent = 'Connect Repository';
+  }
+}